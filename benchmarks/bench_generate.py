@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark for generating samples from raw and compiled schemas
+
+Usage: python benchmarks/bench_generate.py [--number N]
+"""
+import argparse
+import timeit
+
+from json_schema_fuzz import compile_schema, generate_json
+from json_schema_fuzz.codegen import compile_generator
+
+SCHEMAS = {
+    "oneOf": {
+        "type": "integer",
+        "oneOf": [
+            {"multipleOf": 3},
+            {"multipleOf": 5},
+            {"oneOf": [{"minimum": 50}, {"multipleOf": 2}]},
+        ],
+    },
+    "nested anyOf": {
+        "type": "object",
+        "required": ["a", "b", "c"],
+        "properties": {
+            key: {
+                "anyOf": [
+                    {"type": "string", "maxLength": 5},
+                    {"type": "number", "minimum": 0},
+                    {"allOf": [{"type": "integer"}, {"maximum": 3}]},
+                ],
+            }
+            for key in ("a", "b", "c")
+        },
+    },
+}
+
+
+def main():
+    """ Time generating samples from each schema """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=1000,
+                        help="Number of samples per schema")
+    args = parser.parse_args()
+
+    for name, schema in SCHEMAS.items():
+        compiled = compile_schema(schema)
+        generators = {
+            "raw": lambda schema=schema: generate_json(schema),
+            "compiled": lambda compiled=compiled: generate_json(compiled),
+            "codegen": compile_generator(schema),
+        }
+        for label, generator in generators.items():
+            best = min(timeit.repeat(
+                generator,
+                number=args.number,
+                repeat=3,
+            ))
+            print(f"{name:>16} {label:>8}: "
+                  f"{best / args.number * 1e6:8.1f} us/sample")
+
+
+if __name__ == "__main__":
+    main()
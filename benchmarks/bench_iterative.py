@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark recursive and iterative generation on wide and deep schemas
+
+Usage: python benchmarks/bench_iterative.py [--number N]
+"""
+import argparse
+import random
+import timeit
+
+from json_schema_fuzz import compile_schema, generate_json
+from json_schema_fuzz.iterative import generate_json_iterative
+
+
+def wide_schema(width=50):
+    """ Object with many properties holding arrays of small objects """
+    return {
+        "type": "object",
+        "required": [f"p{index}" for index in range(width)],
+        "properties": {
+            f"p{index}": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["id"],
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "flag": {"type": "boolean"},
+                    },
+                },
+            }
+            for index in range(width)
+        },
+    }
+
+
+def deep_schema(depth=300):
+    """ Chain of nested objects """
+    schema = {"type": "integer"}
+    for _ in range(depth):
+        schema = {
+            "type": "object",
+            "required": ["child"],
+            "properties": {"child": schema, "leaf": {"type": "null"}},
+        }
+    return schema
+
+
+def main():
+    """ Time both generators on each schema """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100,
+                        help="Number of samples per schema")
+    args = parser.parse_args()
+
+    schemas = {"wide": wide_schema(), "deep": deep_schema()}
+    generators = {
+        "recursive": generate_json,
+        "iterative": generate_json_iterative,
+    }
+    for name, schema in schemas.items():
+        schema = compile_schema(schema)
+        for label, generator in generators.items():
+            random.seed(0)
+            best = min(timeit.repeat(
+                lambda generator=generator, schema=schema: generator(schema),
+                number=args.number,
+                repeat=3,
+            ))
+            print(f"{name:>5} {label:>9}: "
+                  f"{best / args.number * 1e3:8.2f} ms/sample")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for merging many small schemas
+
+Usage: python benchmarks/bench_merge.py [--number N]
+"""
+import argparse
+import glob
+import json
+import timeit
+from pathlib import Path
+
+from json_schema_fuzz.schema_operations import merge
+
+MERGE_CASE_DIR = Path(__file__).parent.parent / "tests" / "merge_cases"
+
+
+def load_cases():
+    """ Load the schema lists from the merge test cases """
+    cases = []
+    for filename in sorted(glob.glob(str(MERGE_CASE_DIR / "*.json"))):
+        with open(filename, "r") as stream:
+            cases.append(json.load(stream)["schemas"])
+    return cases
+
+
+def main():
+    """ Time merging each test case and report merges per second """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000,
+                        help="Number of times to merge each case")
+    args = parser.parse_args()
+
+    cases = load_cases()
+    # Small merges of the kind done while simplifying schemas
+    cases.append([{"minimum": 1}, {"maximum": 5}])
+    cases.append([{"type": ["string", "null"]}, {"type": "string"}])
+    cases.append([{"minLength": 2}, {}, {"maxLength": 3}])
+
+    def run():
+        for schemas in cases:
+            merge(*schemas)
+
+    best = min(timeit.repeat(run, number=args.number, repeat=5))
+    merges = args.number * len(cases)
+    print(f"{merges} merges in {best:.3f}s "
+          f"({merges / best:,.0f} merges/s, "
+          f"{best / merges * 1e6:.2f} us/merge)")
+
+
+if __name__ == "__main__":
+    main()
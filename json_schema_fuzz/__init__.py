@@ -1,16 +1,62 @@
 """JSON schema fuzzer."""
+# pylint: disable=too-many-lines
+import copy
+import functools
 import random
+import re
 import string
 from decimal import Decimal
 
 import exrex
 
-from .schema_operations import merge
-from .utils import (ALL_TYPES, custom_json_loads, listify,
-                    random_multiple_in_range)
+from .formats import FORMAT_LENGTH_RANGES, FORMAT_SAMPLERS
+from .pools import STRING_POOLS
+from .schema_operations import (enum_values, has_format, invert, merge,
+                                without_type)
+from .utils import (ALL_TYPES, canonical_json, custom_json_loads, derive_seed,
+                    listify, random_multiple_in_range, structural_hashes)
 
 MAX_REJECTED_SAMPLES = 1000
 
+# Keys in a compiled anyOf node
+COMPILED_ANYOF_KEYS = {"anyOf", "anyOfWeights"}
+
+# Equal anyOf branches are found by comparing subschemas this deep
+BRANCH_HASH_DEPTH = 8
+
+# Schemas compiled by generate_json, keyed by structural hash
+COMPILE_CACHE = {}
+COMPILE_CACHE_SIZE = 128
+
+# Default upper bound on the number of keys added to an
+# object beyond its properties
+MAX_ADDITIONAL_PROPERTIES = 10
+
+# Stop drawing keys from a pattern after this many draws in a
+# row give a key the object already has
+MAX_DUPLICATE_KEYS = 20
+
+# Length of random keys drawn for additionalProperties
+ADDITIONAL_KEY_LENGTH = 8
+
+# Keywords used to draw keys beyond an object's properties
+ADDITIONAL_PROPERTIES_KEYS = {
+    "patternProperties",
+    "additionalProperties",
+    "minProperties",
+    "maxProperties",
+}
+
+# Key samplers keyed by the id of their patternProperties
+KEY_SAMPLERS = {}
+KEY_SAMPLERS_SIZE = 1024
+
+# Shared default for missing patternProperties
+NO_PATTERN_PROPERTIES = {}
+
+# Marks keys drawn for additionalProperties
+ADDITIONAL = -1
+
 
 class RejectionSamplingFailed(Exception):
     """
@@ -53,8 +99,12 @@ def get_minimum_maximum(schema, schema_type):
     return minimum, maximum
 
 
-def random_integer(schema):
-    """Generate random integer."""
+def get_integer_range(schema):
+    """
+    Get the range and multiples used to sample an integer
+
+    Returns minimum, maximum, multipleOf and a list of notMultipleOf
+    """
 
     multiple_of = schema.get("multipleOf", Decimal(1))
 
@@ -77,6 +127,15 @@ def random_integer(schema):
     if not isinstance(not_multiple_of, list):
         not_multiple_of = [not_multiple_of]
 
+    return minimum, maximum, multiple_of, not_multiple_of
+
+
+def random_integer(schema):
+    """Generate random integer."""
+
+    minimum, maximum, multiple_of, not_multiple_of = \
+        get_integer_range(schema)
+
     for _ in range(MAX_REJECTED_SAMPLES):
         # Generate new value
         value = random_multiple_in_range(
@@ -92,8 +151,13 @@ def random_integer(schema):
     raise RejectionSamplingFailed()
 
 
-def random_number(schema):
-    """Generate random number."""
+def get_number_range(schema):
+    """
+    Get the range and multiples used to sample a number
+
+    Returns minimum, maximum, multipleOf and a list of notMultipleOf.
+    multipleOf is None if the number is sampled continuously.
+    """
 
     minimum, maximum = get_minimum_maximum(schema, "number")
 
@@ -112,9 +176,7 @@ def random_number(schema):
 
         # We don't have to worry about notMultipleOf
         # because it's a continuous sample (infintesimal odds)
-        return Decimal(
-            random.uniform(float(minimum), float(maximum))
-        )
+        return minimum, maximum, None, []
 
     default_range = 100 * multiple_of
 
@@ -132,6 +194,20 @@ def random_number(schema):
     if not isinstance(not_multiple_of, list):
         not_multiple_of = [not_multiple_of]
 
+    return minimum, maximum, multiple_of, not_multiple_of
+
+
+def random_number(schema):
+    """Generate random number."""
+
+    minimum, maximum, multiple_of, not_multiple_of = \
+        get_number_range(schema)
+
+    if multiple_of is None:
+        return Decimal(
+            random.uniform(float(minimum), float(maximum))
+        )
+
     for _ in range(MAX_REJECTED_SAMPLES):
         value = random_multiple_in_range(
             minimum,
@@ -149,30 +225,247 @@ def random_number(schema):
 def random_object(schema):
     """Generate random JSON object."""
 
-    properties = schema.get("properties", dict())
-    required = schema.get("required", [])
-
     object = dict()
-    for key, value in properties.items():
-        if key in required or random.choice([True, False]):
-            object[key] = generate_json(value)
+    for key in choose_properties(schema):
+        object[key] = generate_json(property_schema(schema, key))
+    for key, value in additional_properties(schema, len(object)):
+        object[key] = generate_json(value)
     return object
 
 
+def choose_properties(schema):
+    """
+    Choose which of an object's properties to generate
+
+    Required properties are always included and each optional one
+    is included with probability one half. If that would break
+    maxProperties, optional properties are dropped at random, and
+    if it would fall short of minProperties, more are added at
+    random. Returns the keys in the order of properties.
+    """
+    properties = schema.get("properties", {})
+    required = schema.get("required", [])
+    chosen = [
+        key for key in properties
+        if key in required or random.choice([True, False])
+    ]
+    if "minProperties" not in schema and "maxProperties" not in schema:
+        return chosen
+
+    num_required = sum(key in required for key in properties)
+    optional = [key for key in chosen if key not in required]
+    room = int(schema.get("maxProperties", len(properties))) - num_required
+    if len(optional) > room:
+        optional = random.sample(optional, max(0, room))
+    missing = int(schema.get("minProperties", 0)) - \
+        num_required - len(optional)
+    if missing > 0:
+        unchosen = [
+            key for key in properties
+            if key not in required and key not in optional
+        ]
+        optional += random.sample(unchosen, min(missing, len(unchosen)))
+
+    optional = set(optional)
+    return [
+        key for key in properties if key in required or key in optional
+    ]
+
+
+def property_schema(schema, key):
+    """
+    Get the subschema for the value of a declared property,
+    which must also satisfy every matching patternProperties
+    """
+    subschema = schema["properties"][key]
+    pattern_properties = schema.get("patternProperties", None)
+    if not pattern_properties:
+        return subschema
+    sampler = key_sampler(pattern_properties)
+    return sampler.value_schema(sampler.matching(key), subschema)
+
+
+class KeySampler:
+    """
+    Draws keys matching patternProperties and finds
+    the subschema that their values must satisfy
+    """
+
+    def __init__(self, pattern_properties):
+        # Keep patternProperties alive so its id stays unique
+        self.pattern_properties = pattern_properties
+        self.patterns = list(pattern_properties)
+        self.regexes = [re.compile(pattern) for pattern in self.patterns]
+        self.subschemas = list(pattern_properties.values())
+        self.value_schemas = {}
+
+    def matching(self, key):
+        """ Get the indexes of the patterns that match key """
+        return tuple(
+            index for index, regex in enumerate(self.regexes)
+            if regex.search(key)
+        )
+
+    def value_schema(self, matching, subschema=None):
+        """
+        Get the compiled subschema for a key matching the
+        patterns at the given indexes, and subschema if given
+        """
+        if subschema is not None:
+            if not matching:
+                return subschema
+            cache_key = (matching, id(subschema))
+        else:
+            cache_key = matching
+        entry = self.value_schemas.get(cache_key, None)
+        if entry is None:
+            schemas = [self.subschemas[index] for index in matching]
+            if subschema is not None:
+                schemas.insert(0, subschema)
+            if len(schemas) == 1:
+                schema = schemas[0]
+            else:
+                # The value must satisfy every matching schema
+                schema = compile_schema(merge(*schemas))
+            # Keep subschema alive so its id stays unique
+            entry = self.value_schemas[cache_key] = (schema, subschema)
+        return entry[0]
+
+
+def key_sampler(pattern_properties):
+    """ Get the cached key sampler for patternProperties """
+    sampler = KEY_SAMPLERS.get(id(pattern_properties), None)
+    if sampler is None:
+        sampler = KeySampler(pattern_properties)
+        if len(KEY_SAMPLERS) >= KEY_SAMPLERS_SIZE:
+            # Evict the oldest entry
+            del KEY_SAMPLERS[next(iter(KEY_SAMPLERS))]
+        KEY_SAMPLERS[id(pattern_properties)] = sampler
+    return sampler
+
+
+def random_key():
+    """ Generate a random key for additionalProperties """
+    return "".join(
+        random.choices(string.ascii_lowercase, k=ADDITIONAL_KEY_LENGTH))
+
+
+def additional_properties(schema, num_properties):
+    """
+    Choose keys to add to an object beyond its properties
+
+    Keys are drawn from the patternProperties regexes and, if it is
+    a subschema, additionalProperties. Keys for additionalProperties
+    don't match any pattern. Unless additionalProperties is False,
+    random keys with any value are also drawn while the object has
+    fewer than minProperties. The number of keys keeps the object
+    between minProperties and maxProperties, and is at most
+    MAX_ADDITIONAL_PROPERTIES if maxProperties isn't given. A source
+    of keys is dropped once MAX_DUPLICATE_KEYS draws in a row from
+    it give keys the object already has.
+
+    num_properties is the number of properties already generated.
+    Returns a list of (key, subschema) pairs.
+    """
+    pattern_properties = schema.get(
+        "patternProperties", NO_PATTERN_PROPERTIES)
+    additional = schema.get("additionalProperties", True)
+    min_properties = int(schema.get("minProperties", 0))
+    if (
+            not pattern_properties and
+            not isinstance(additional, dict) and
+            num_properties >= min_properties
+    ):
+        return []
+
+    sampler = key_sampler(pattern_properties)
+    sources = list(range(len(sampler.patterns)))
+    if isinstance(additional, dict):
+        sources.append(ADDITIONAL)
+
+    low, high = additional_count_range(schema, num_properties, bool(sources))
+    if low > 0 and additional is True:
+        # Any other key is allowed, so random keys can fill the object
+        additional = {}
+        sources.append(ADDITIONAL)
+    count = random.randint(min(low, high), high)
+
+    pairs = draw_keys(
+        sampler, sources, additional, count, schema.get("properties", {}))
+    if len(pairs) < low:
+        # Not enough other keys are allowed
+        raise RejectionSamplingFailed()
+    return pairs
+
+
+def draw_keys(sampler, sources, additional, count, properties):
+    """
+    Draw up to count distinct keys that aren't in properties
+
+    Returns a list of (key, subschema) pairs. Sources that
+    give MAX_DUPLICATE_KEYS unusable keys in a row are dropped.
+    """
+    sources = list(sources)
+    pairs = []
+    drawn = set()
+    duplicates = dict.fromkeys(sources, 0)
+    while len(pairs) < count and sources:
+        source = random.choice(sources)
+        key, value = draw_key(sampler, source, additional)
+        if value is False or key in properties or key in drawn:
+            duplicates[source] += 1
+            if duplicates[source] >= MAX_DUPLICATE_KEYS:
+                # The source may not allow any more distinct keys
+                sources.remove(source)
+            continue
+        duplicates[source] = 0
+        drawn.add(key)
+        pairs.append((key, value))
+    return pairs
+
+
+def additional_count_range(schema, num_properties, unbounded):
+    """
+    Get the lowest and highest number of keys to add to an object
+
+    If unbounded is False and maxProperties isn't given, keys
+    are only added to reach minProperties.
+    """
+    low = max(0, int(schema.get("minProperties", 0)) - num_properties)
+    if "maxProperties" in schema:
+        high = max(0, int(schema["maxProperties"]) - num_properties)
+    elif unbounded:
+        high = max(low, MAX_ADDITIONAL_PROPERTIES)
+    else:
+        high = low
+    return low, high
+
+
+def draw_key(sampler, source, additional):
+    """
+    Draw a key from a pattern or for additionalProperties
+
+    Returns the key and the subschema for its value,
+    which is False if the key isn't allowed.
+    """
+    if source == ADDITIONAL:
+        key = random_key()
+        return key, False if sampler.matching(key) else additional
+    key = exrex.getone(sampler.patterns[source])
+    matching = sampler.matching(key)
+    return key, sampler.value_schema(matching) if matching else False
+
+
 def random_boolean(schema):
     """Generate random JSON boolean."""
     return random.choice([True, False])
 
 
-def random_string(schema):
-    """Generate random string."""
-
-    min_length = schema.get("minLength", 0)
-    max_length = schema.get("maxLength", min_length + 50)
+def generate_string(pattern, min_length, max_length):
+    """Generate random string from a pattern and length range."""
 
     for _ in range(MAX_REJECTED_SAMPLES):
         # Generate new value
-        pattern = schema.get("pattern", None)
         if pattern is not None:
             # Use exrex to generate pattern
             value = exrex.getone(pattern)
@@ -187,6 +480,76 @@ def random_string(schema):
     raise RejectionSamplingFailed()
 
 
+def get_format_length_range(schema):
+    """
+    Get the length range of a string built by a format sampler
+
+    maxLength defaults to the longest string the sampler builds.
+    """
+    min_length = schema.get("minLength", 0)
+    max_length = schema.get(
+        "maxLength", FORMAT_LENGTH_RANGES[schema["format"]][1])
+    return min_length, max_length
+
+
+def generate_formatted(sampler, min_length, max_length):
+    """Generate random string from a format sampler and length range."""
+
+    for _ in range(MAX_REJECTED_SAMPLES):
+        value = sampler()
+        if min_length <= len(value) and len(value) <= max_length:
+            return value
+    raise RejectionSamplingFailed()
+
+
+def random_string(schema):
+    """Generate random string."""
+
+    if schema.get("notFormat", None):
+        return generate_without_format(schema)
+
+    min_length = schema.get("minLength", 0)
+    max_length = schema.get("maxLength", min_length + 50)
+    pattern = schema.get("pattern", None)
+
+    # Build strings in a known format directly
+    sampler = FORMAT_SAMPLERS.get(schema.get("format", None), None)
+    if sampler is not None and pattern is None:
+        return generate_formatted(
+            sampler, *get_format_length_range(schema))
+
+    # Draw strings with constraints from a pool if enabled
+    if STRING_POOLS.enabled and (
+            pattern is not None or
+            "minLength" in schema or
+            "maxLength" in schema
+    ):
+        pool = STRING_POOLS.get(
+            (pattern, min_length, max_length),
+            functools.partial(
+                generate_string, pattern, min_length, max_length),
+        )
+        return pool.sample()
+
+    return generate_string(pattern, min_length, max_length)
+
+
+def generate_without_format(schema):
+    """
+    Generate random string from schema, retrying
+    while it may be in one of the formats in notFormat
+    """
+    formats = schema["notFormat"]
+    schema = dict(schema)
+    del schema["notFormat"]
+
+    for _ in range(MAX_REJECTED_SAMPLES):
+        value = random_string(schema)
+        if not has_format(value, formats):
+            return value
+    raise RejectionSamplingFailed()
+
+
 def random_array(schema):
     """Generate random array.
     Default min and max length are set to 0 and 10, respectively.
@@ -200,24 +563,69 @@ def random_array(schema):
     return output_array
 
 
+def random_enum(schema):
+    """Choose one of the values of a compiled enum."""
+    value = random.choice(schema["enum"])
+    # Don't share mutable values with the schema
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+def generate_excluding(schema, instance_type):
+    """
+    Generate an instance of a type from schema,
+    retrying while it is one of the values in notEnum
+    """
+    excluded = {canonical_json(value) for value in schema["notEnum"]}
+    schema = dict(schema, type=instance_type)
+    del schema["notEnum"]
+
+    for _ in range(MAX_REJECTED_SAMPLES):
+        value = generate_json(schema)
+        if canonical_json(value) not in excluded:
+            return value
+    raise RejectionSamplingFailed()
+
+
 def generate_json_from_string(schema_str):
     """ Parse schema from string and generate random JSON data """
     schema = custom_json_loads(schema_str)
     return generate_json(schema)
 
 
+def sample_at(schema, seed, index):
+    """
+    Generate document number `index` of the sequence for `seed`.
+
+    Each document is generated from its own seed derived from
+    (seed, index), so ranges of the sequence can be generated
+    independently and in any order. This reseeds the global
+    random number generator.
+    """
+    random.seed(derive_seed(seed, index))
+    return generate_json(schema)
+
+
+def sample_range(schema, seed, start, stop):
+    """ Generate documents start to stop (exclusive) for `seed` """
+    for index in range(start, stop):
+        yield sample_at(schema, seed, index)
+
+
 def simplify_schema(schema):
     """
     Process schema to remove values that are hard
-    to generate such as allOf and oneOf
+    to generate such as allOf, oneOf and not
     """
 
-    # Merge allOf and oneOf into the schema until we don't have any left
-    # The merge might add more allOfs so we use a while loop
-    while True:
+    # Merge allOf, oneOf and not into the schema until we don't have
+    # any left. The merge might add more allOfs so we use a while loop
+    while schema is not False:
         one_of = schema.pop("oneOf", [])
         all_of = schema.pop("allOf", [])
-        if len(all_of) == 0 and len(one_of) == 0:
+        not_schema = schema.pop("not", None)
+        if len(all_of) == 0 and len(one_of) == 0 and not_schema is None:
             break
 
         # If we have oneOf we can
@@ -225,6 +633,10 @@ def simplify_schema(schema):
         if len(one_of) > 0:
             schema = merge(schema, {"oneOf": one_of})
 
+        # not holds when the inverse of its subschema does
+        if not_schema is not None:
+            schema = merge(schema, invert(not_schema))
+
         # Merge allOf into the base
         if len(all_of) > 0:
             schema = merge(schema, *all_of)
@@ -232,22 +644,385 @@ def simplify_schema(schema):
     return schema
 
 
-# pylint: disable=too-many-return-statements
-# pylint: disable=too-many-branches
-def generate_json(schema):
-    """Generate random JSON conforming to schema."""
+def check_weights(any_of, weights):
+    """ Get the weights of anyOf branches, which are equal by default """
+    if weights is None:
+        return [1] * len(any_of)
+    if len(weights) != len(any_of):
+        raise ValueError(
+            "anyOfWeights must have one weight per anyOf branch")
+    return weights
+
+
+# pylint: disable=too-few-public-methods
+class AnyOfGroup:
+    """
+    Alternatives of an anyOf being compiled
+
+    children holds (weight, group) pairs for nested anyOf
+    groups and (weight, compiled schema) pairs for the rest.
+    """
+
+    def __init__(self, base, any_of, weights):
+        self.base = base
+        self.any_of = any_of
+        self.weights = check_weights(any_of, weights)
+        self.children = []
+        # Whether any alternative below this group can be valid
+        self.valid = False
+
+
+def compile_anyof(base, any_of, weights, stack):
+    """
+    Pre-merge each anyOf branch with the rest of the schema
+
+    Returns a schema with the complete alternatives under "anyOf"
+    and, if they are not all equal, their weights under
+    "anyOfWeights". Nested anyOf alternatives are flattened into
+    the list with their weights scaled accordingly, and equal
+    alternatives are combined into one. Nested anyOfs are visited
+    without recursion. Subschemas of the alternatives are pushed
+    on stack, as in compile_local.
+    """
+    root = AnyOfGroup(base, any_of, weights)
+    groups = expand_anyof(root, stack)
+
+    # Nested groups were created after their parents
+    for group in reversed(groups):
+        group.children = [
+            (weight, child) for weight, child in group.children
+            if not isinstance(child, AnyOfGroup) or child.valid
+        ]
+        group.valid = bool(group.children)
+
+    branches, branch_weights = flatten_anyof(root)
+    branches, branch_weights = combine_equal_branches(
+        branches, branch_weights)
+    if len(branches) == 0:
+        return False
+
+    compiled = {"anyOf": branches}
+    if len(set(branch_weights)) > 1:
+        compiled["anyOfWeights"] = branch_weights
+    return compiled
+
+
+def expand_anyof(root, stack):
+    """
+    Compile the alternatives of an anyOf group, adding
+    nested anyOfs as groups of their own
+
+    Returns every group, each one after its parent.
+    """
+    groups = [root]
+    todo = [root]
+    while todo:
+        group = todo.pop()
+        for branch, weight in zip(group.any_of, group.weights):
+            if group.base:
+                branch = merge(group.base, branch)
+            node, nested, nested_weights = split_anyof(branch)
+            if nested:
+                child = AnyOfGroup(node, nested, nested_weights)
+                groups.append(child)
+                todo.append(child)
+                group.children.append((weight, child))
+                continue
+            compiled = compile_leaf(node, stack)
+            # This branch can never be valid
+            if compiled is not False:
+                group.children.append((weight, compiled))
+    return groups
+
+
+def flatten_anyof(root):
+    """
+    List the compiled alternatives of an anyOf group and its
+    nested groups, and their weights
+
+    The weights of a nested group are scaled to add up
+    to the weight of the group in its parent.
+    """
+    branches = []
+    branch_weights = []
+    pending = [
+        (child, float(weight)) for weight, child in reversed(root.children)]
+    while pending:
+        child, weight = pending.pop()
+        if not isinstance(child, AnyOfGroup):
+            branches.append(child)
+            branch_weights.append(weight)
+            continue
+        total = sum(nested_weight for nested_weight, _ in child.children)
+        pending.extend(
+            (nested, weight * nested_weight / total)
+            for nested_weight, nested in reversed(child.children)
+        )
+    return branches, branch_weights
+
+
+def combine_equal_branches(branches, weights):
+    """ Keep one copy of equal branches with their combined weight """
+    indexes = {}
+    unique_branches = []
+    unique_weights = []
+    for branch, weight in zip(branches, weights):
+        key = branch if isinstance(branch, bool) else \
+            structural_hashes(branch, BRANCH_HASH_DEPTH)[id(branch)]
+        index = indexes.get(key, None)
+        if index is None:
+            indexes[key] = len(unique_branches)
+            unique_branches.append(branch)
+            unique_weights.append(weight)
+        else:
+            unique_weights[index] += weight
+    return unique_branches, unique_weights
+
+
+def compile_node(schema, cache=None, hashes=None):
+    """
+    Compile a schema and its subschemas without modifying them
+
+    Subschemas are visited with an explicit stack so that
+    deeply nested schemas don't hit the recursion limit.
+
+    If cache is given, compiled subschemas are stored in it
+    under their structural hash (from hashes) and subschemas
+    already in it are reused without being compiled again.
+    """
+    if cache is not None and hashes is None:
+        hashes = structural_hashes(schema)
+
+    # Holds the root so it can be replaced like any other subschema
+    holder = [schema]
+    stack = [(holder, 0)]
+    while stack:
+        container, key = stack.pop()
+        node = container[key]
+        if isinstance(node, bool):
+            continue
+
+        subtree_hash = None
+        if cache is not None:
+            # Subschemas created while compiling have no hash
+            subtree_hash = hashes.get(id(node), None)
+            if subtree_hash in cache:
+                container[key] = cache[subtree_hash]
+                continue
+
+        node = compile_local(node, stack)
+        container[key] = node
+        if subtree_hash is not None:
+            # Subschemas are filled in later, in place
+            cache[subtree_hash] = node
 
-    simplify_schema(schema)
+    return holder[0]
 
-    # If we have anyOf select one for the current instance
-    any_of = schema.get("anyOf", [])
-    if len(any_of) > 0:
-        instance_anyof = random.choice(any_of)
-        schema = merge(schema, instance_anyof)
+
+def compile_local(schema, stack):
+    """
+    Compile a schema node but not its subschemas
+
+    The containers of its subschemas are copied and
+    pushed on stack for compile_node to compile them.
+    """
+    node, any_of, weights = split_anyof(schema)
+    if any_of:
+        return compile_anyof(node, any_of, weights, stack)
+    return compile_leaf(node, stack)
+
+
+def split_anyof(schema):
+    """
+    Simplify a copy of a schema node and take out its anyOf
+
+    Returns the node, its anyOf (None if it has none)
+    and anyOfWeights (None if not given).
+    """
+    if isinstance(schema, bool):
+        return schema, None, None
+    node = simplify_schema(dict(schema))
+    if node is False:
+        return False, None, None
+    any_of = node.pop("anyOf", None)
+    weights = node.pop("anyOfWeights", None)
+    return node, any_of, weights
+
+
+def compile_leaf(node, stack):
+    """
+    Compile a simplified schema node without anyOf,
+    as in compile_local
+    """
+    if isinstance(node, bool):
+        return node
+    if "enum" in node or "const" in node:
+        return compile_enum(node)
+    node = compile_format(node)
+    if node is not False:
+        push_subschemas(node, stack)
+    return node
+
+
+def compile_enum(schema):
+    """
+    Reduce a schema with enum or const to the values
+    it allows, or False if there are none
+    """
+    values = enum_values(schema)
+    if len(values) == 0:
+        return False
+    return {"enum": values}
+
+
+def format_lengths_fit(schema):
+    """
+    Check if the sampler for a schema's format can build a string
+    within its length bounds. Schemas without a format sampler fit.
+    """
+    lengths = FORMAT_LENGTH_RANGES.get(schema.get("format", None), None)
+    if lengths is None or "pattern" in schema:
+        return True
+    min_length, max_length = get_format_length_range(schema)
+    return max(lengths[0], min_length) <= min(lengths[1], max_length)
+
+
+def compile_format(schema):
+    """
+    Rule out strings from a schema whose format sampler can't
+    build a string within its length bounds
+
+    Returns False if no other type is allowed.
+    """
+    if format_lengths_fit(schema):
+        return schema
+    # The format only applies to strings
+    del schema["format"]
+    return without_type(schema, "string")
+
+
+def push_subschemas(node, stack):
+    """ Copy the containers of subschemas in node and push them """
+    properties = node.get("properties", None)
+    if properties:
+        properties = node["properties"] = dict(properties)
+        stack.extend((properties, name) for name in properties)
+
+    items = node.get("items", None)
+    if isinstance(items, list):
+        items = node["items"] = list(items)
+        stack.extend((items, index) for index in range(len(items)))
+    elif items is not None:
+        stack.append((node, "items"))
+
+    pattern_properties = node.get("patternProperties", None)
+    if pattern_properties:
+        pattern_properties = node["patternProperties"] = \
+            dict(pattern_properties)
+        stack.extend(
+            (pattern_properties, pattern) for pattern in pattern_properties)
+
+    if isinstance(node.get("additionalProperties", None), dict):
+        stack.append((node, "additionalProperties"))
+
+
+def compile_schema(schema, cache=None, hashes=None):
+    """
+    Normalize a schema once so that it can be
+    reused to generate many samples.
+
+    oneOf and allOf are merged away at every level and each
+    anyOf branch is pre-merged with the rest of its schema, so
+    choosing a branch while generating is an index lookup.
+    Branches can be given relative weights with the custom
+    anyOfWeights keyword.
+
+    cache is an optional dict of compiled subschemas keyed by
+    structural hash. Passing the same cache when compiling an
+    edited schema only compiles the subschemas that changed.
+
+    The input schema is not modified, although the compiled
+    schema may share unchanged values with it.
+    """
+    return compile_node(schema, cache, hashes)
+
+
+def compile_cached(schema):
+    """
+    Compile a schema, reusing the result for structurally
+    equal schemas compiled recently
+    """
+    # Hashed without recursion since the schema may be deeply nested
+    key = structural_hashes(schema)[id(schema)]
+    compiled = COMPILE_CACHE.get(key, None)
+    if compiled is None:
+        compiled = compile_schema(schema)
+        if len(COMPILE_CACHE) >= COMPILE_CACHE_SIZE:
+            # Evict the oldest entry
+            del COMPILE_CACHE[next(iter(COMPILE_CACHE))]
+        COMPILE_CACHE[key] = compiled
+    return compiled
+
+
+def is_compiled(schema):
+    """ Check if a schema node is in the form made by compile_schema """
+    if not isinstance(schema, dict):
+        return True
+    if "oneOf" in schema or "allOf" in schema or "not" in schema:
+        return False
+    if "anyOf" in schema:
+        return schema.keys() <= COMPILED_ANYOF_KEYS
+    if "enum" in schema or "const" in schema:
+        return schema.keys() == {"enum"}
+    return format_lengths_fit(schema)
+
+
+def select_instance(schema):
+    """
+    Resolve a schema to the subschema and type
+    used to generate a single instance.
+
+    The type is "enum" if the value is chosen from an enum.
+    """
+    while True:
+        if not is_compiled(schema):
+            schema = compile_cached(schema)
+
+        if schema is True:
+            schema = {}
+        elif schema is False:
+            raise RejectionSamplingFailed()
+
+        # If we have anyOf select one for the current instance
+        any_of = schema.get("anyOf", None)
+        if not any_of:
+            break
+        weights = schema.get("anyOfWeights", None)
+        if weights:
+            schema = random.choices(any_of, weights=weights)[0]
+        else:
+            schema = random.choice(any_of)
+
+    # Values are chosen directly from an enum
+    if "enum" in schema:
+        return schema, "enum"
 
     # Select a type
     possible_types = listify(schema.get("type", ALL_TYPES))
     instance_type = random.choice(possible_types)
+    return schema, instance_type
+
+
+# pylint: disable=too-many-return-statements
+def generate_json(schema):
+    """Generate random JSON conforming to schema."""
+
+    schema, instance_type = select_instance(schema)
+
+    if instance_type == "enum":
+        return random_enum(schema)
+    if "notEnum" in schema:
+        return generate_excluding(schema, instance_type)
 
     if instance_type == "number":
         return random_number(schema)
@@ -0,0 +1,107 @@
+""" Cache of compiled schemas """
+import os
+
+from . import compile_schema
+from .utils import custom_json_loads, schema_hash, structural_hashes
+
+
+class SchemaCache:
+    """
+    In-memory store of compiled schemas keyed by structural hash.
+
+    Each distinct schema is only compiled once, no matter how
+    many times it is added. Subschemas shared between schemas,
+    such as the unchanged parts of an edited schema file, are
+    only compiled once as well.
+    """
+
+    def __init__(self):
+        self._compiled = {}
+        # Compiled subschemas keyed by structural hash
+        self._subschemas = {}
+        # Maps file path to (modification time, schema hash)
+        self._files = {}
+
+    def add(self, schema):
+        """ Compile schema if it is not cached and return its hash """
+        key = schema_hash(schema)
+        if key not in self._compiled:
+            self._compiled[key] = compile_schema(schema, self._subschemas)
+        return key
+
+    def add_file(self, path):
+        """
+        Load and compile the schema stored at path and return its hash.
+
+        The file is only read again if it has been modified.
+        """
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        cached = self._files.get(path, None)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r") as stream:
+            key = self.add(custom_json_loads(stream.read()))
+        self._files[path] = (mtime, key)
+        return key
+
+    def get(self, key):
+        """ Get compiled schema by hash """
+        return self._compiled[key]
+
+    def __contains__(self, key):
+        return key in self._compiled
+
+    def __len__(self):
+        return len(self._compiled)
+
+
+# pylint: disable=too-few-public-methods
+class SchemaWatcher:
+    """
+    Recompiles a schema file whenever it is modified.
+
+    Only the subschemas that changed since the last version
+    are compiled again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.schema = None
+        # Number of subschemas compiled for the last version
+        self.recompiled = 0
+        self._subschemas = {}
+
+    def poll(self):
+        """
+        Get the compiled schema if the file was modified
+        since the last call, otherwise None.
+
+        Raises ValueError if the modified file is not valid JSON.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # The file may be in the middle of being replaced
+            return None
+        if mtime == self.mtime:
+            return None
+        self.mtime = mtime
+
+        with open(self.path, "r") as stream:
+            schema = custom_json_loads(stream.read())
+
+        hashes = structural_hashes(schema)
+        previous = len(self._subschemas)
+        self.schema = compile_schema(schema, self._subschemas, hashes)
+        self.recompiled = len(self._subschemas) - previous
+
+        # Forget subschemas that are no longer in the file
+        current = set(hashes.values())
+        self._subschemas = {
+            key: value for key, value in self._subschemas.items()
+            if key in current
+        }
+        return self.schema
@@ -0,0 +1,254 @@
+""" Command line interface """
+import functools
+import json
+import random
+import sys
+import time
+
+import click
+
+from . import (RejectionSamplingFailed, compile_schema, custom_json_loads,
+               generate_json)
+from .cache import SchemaWatcher
+from .codegen import generate_source
+from .explain import explain_schema
+from .load import run_load
+from .mutate import mutate_json
+from .pools import enable_string_pools
+from .server import serve
+from .shards import write_shards
+from .utils import custom_json_dumps, derive_seed
+from .workload import load_workload
+
+
+class DefaultGroup(click.Group):
+    """
+    Command group that falls back to a default command
+
+    This keeps `json_schema_fuzz SCHEMA_FILE` working
+    alongside the named subcommands.
+    """
+
+    def __init__(self, *args, default_command=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (
+                args[0] not in self.commands and
+                args[0] not in self.get_help_option_names(ctx)
+        ):
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup, default_command="generate")
+def cli():
+    """ Generate random JSON conforming to a JSON schema """
+
+
+@cli.command("generate")
+@click.argument("schema-file", type=click.Path(exists=True))
+@click.option("-c", "--count",
+              default=1,
+              help="Number of samples to generate")
+@click.option("-o", "--output-filename-prefix",
+              help="If given, write samples to compressed NDJSON shards \
+                    {prefix}-{shard}.ndjson.gz with a manifest \
+                    {prefix}-manifest.json")
+@click.option("--shards", default=1, type=click.IntRange(min=1),
+              help="Number of shard files to split samples over")
+@click.option("--processes", type=click.IntRange(min=1),
+              help="Number of worker processes writing shards \
+                    (defaults to one per shard, up to the number of CPUs)")
+@click.option("-m", "--mix", is_flag=True,
+              help="Treat SCHEMA_FILE as a workload manifest or a \
+                    directory of schemas and interleave samples by weight")
+@click.option("--mutate", is_flag=True,
+              help="Derive each sample after the first by regenerating \
+                    a random subtree of the previous sample")
+@click.option("--seed", type=int,
+              help="Generate a reproducible sequence where each sample \
+                    only depends on the seed and its index")
+@click.option("--start-index", default=0,
+              help="Index of the first sample when using --seed")
+@click.option("--string-pool-size", type=int,
+              help="Draw pattern and length-bounded strings from pools \
+                    of this many pre-generated values")
+@click.option("-w", "--watch", is_flag=True,
+              help="Keep running and print new samples each time \
+                    SCHEMA_FILE changes")
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+def generate_json_command(
+        schema_file, count, output_filename_prefix, shards, processes,
+        mix, mutate, seed, start_index, string_pool_size, watch):
+    """ Generate JSON from schema using the command line """
+    if mix and mutate:
+        raise click.UsageError("--mix and --mutate can't be combined")
+    if output_filename_prefix and mutate:
+        raise click.UsageError(
+            "--mutate can't be combined with --output-filename-prefix")
+    if watch and (mix or output_filename_prefix):
+        raise click.UsageError(
+            "--watch can't be combined with --mix "
+            "or --output-filename-prefix")
+
+    if string_pool_size:
+        enable_string_pools(string_pool_size)
+
+    if watch:
+        watch_schema(schema_file, count, mutate, seed, start_index)
+        return
+
+    if mix:
+        sample = load_workload(schema_file).sample
+    else:
+        with open(schema_file, "r") as stream:
+            schema = compile_schema(custom_json_loads(stream.read()))
+        sample = functools.partial(generate_json, schema)
+
+    if output_filename_prefix:
+        manifest = write_shards(
+            sample,
+            output_filename_prefix,
+            count,
+            shards=shards,
+            processes=processes,
+            seed=seed,
+            start_index=start_index,
+        )
+        click.echo(f"Wrote {count} samples to {shards} shards "
+                   f"(seed {manifest['seed']})")
+        return
+
+    print_samples(sample, schema if mutate else None, count,
+                  seed, start_index)
+
+
+# pylint: disable=too-many-arguments
+def print_samples(sample, mutate_schema, count, seed, start_index):
+    """
+    Print count samples
+
+    If mutate_schema is given, each sample after the first is
+    derived from the previous one by mutation.
+    """
+    output_json = None
+    for index in range(count):
+        if seed is not None:
+            random.seed(derive_seed(seed, start_index + index))
+        if mutate_schema is not None and index > 0:
+            output_json = mutate_json(mutate_schema, output_json)
+        else:
+            output_json = sample()
+        print(output_json)
+
+
+# pylint: disable=too-many-arguments
+def watch_schema(schema_file, count, mutate, seed, start_index,
+                 interval=0.5):
+    """ Print samples every time the schema file changes """
+    watcher = SchemaWatcher(schema_file)
+    try:
+        while True:
+            try:
+                schema = watcher.poll()
+            except ValueError as error:
+                click.echo(f"Invalid schema: {error}", err=True)
+                schema = None
+
+            if schema is not None:
+                click.echo(f"Recompiled {watcher.recompiled} subschemas",
+                           err=True)
+                try:
+                    print_samples(
+                        functools.partial(generate_json, schema),
+                        schema if mutate else None,
+                        count, seed, start_index,
+                    )
+                except RejectionSamplingFailed:
+                    click.echo("Failed to generate a sample", err=True)
+                sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command("serve")
+@click.option("--host", default="127.0.0.1",
+              help="Address to listen on")
+@click.option("--port", default=8000,
+              help="Port to listen on")
+@click.option("-s", "--schema-file", "schema_files", multiple=True,
+              type=click.Path(exists=True, dir_okay=False),
+              help="Schema to compile at startup (may be repeated)")
+@click.option("--schema-root",
+              type=click.Path(exists=True, file_okay=False),
+              help="Directory of schema files clients may refer to by path")
+def serve_command(host, port, schema_files, schema_root):
+    """ Serve samples over HTTP as NDJSON """
+    click.echo(f"Serving samples on http://{host}:{port}")
+    serve(host, port, schema_files, schema_root)
+
+
+@cli.command("load")
+@click.argument("schema-file", type=click.File("r"))
+@click.argument("url")
+@click.option("-c", "--count",
+              default=1000,
+              help="Number of documents to send")
+@click.option("--concurrency",
+              default=4,
+              help="Number of keep-alive connections")
+@click.option("--rate", type=float,
+              help="Target requests per second (unlimited if not given)")
+@click.option("--timeout", default=10.0,
+              help="Request timeout in seconds")
+@click.option("--string-pool-size", type=int,
+              help="Draw pattern and length-bounded strings from pools \
+                    of this many pre-generated values")
+# pylint: disable=too-many-arguments
+def load_command(
+        schema_file, url, count, concurrency, rate, timeout,
+        string_pool_size):
+    """ POST generated documents to URL and report latency """
+    if string_pool_size:
+        enable_string_pools(string_pool_size)
+    schema = custom_json_loads(schema_file.read())
+    report = run_load(
+        schema,
+        url,
+        count=count,
+        concurrency=concurrency,
+        rate=rate,
+        timeout=timeout,
+    )
+    click.echo(json.dumps(report, indent=2))
+
+
+@cli.command("codegen")
+@click.argument("schema-file", type=click.File("r"))
+@click.option("-o", "--output", type=click.File("w"), default="-",
+              help="Write the module to this file instead of stdout")
+@click.option("-f", "--function-name", default="generate",
+              help="Name of the generated function")
+def codegen_command(schema_file, output, function_name):
+    """ Write a Python module with a generator specialized to a schema """
+    schema = custom_json_loads(schema_file.read())
+    try:
+        source = generate_source(schema, function_name)
+    except NotImplementedError as err:
+        raise click.ClickException(str(err)) from err
+    output.write(source)
+
+
+@cli.command("explain")
+@click.argument("schema-file", type=click.File("r"))
+def explain_command(schema_file):
+    """
+    Estimate the cost of a schema and the size of its
+    documents without generating any
+    """
+    schema = custom_json_loads(schema_file.read())
+    click.echo(custom_json_dumps(explain_schema(schema), indent=2))
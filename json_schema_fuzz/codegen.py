@@ -0,0 +1,414 @@
+"""
+Schema to Python code generation
+
+Turns a compiled schema into the source of a module with a
+specialized generator function. Bounds are precomputed and
+constants inlined, so the generated function does no schema
+lookups or normalization. For the same random state it produces
+the same output as generate_json, which remains the reference
+implementation.
+"""
+from decimal import Decimal
+
+from . import (ADDITIONAL_PROPERTIES_KEYS, compile_schema,
+               get_format_length_range, get_integer_range, get_number_range,
+               property_schema)
+from .formats import FORMAT_SAMPLERS
+from .utils import ALL_TYPES, listify, multiples_in_range
+
+MODULE_HEADER = '''"""
+Generated by json_schema_fuzz.codegen. Do not edit.
+"""
+import random
+import string
+from decimal import Decimal
+
+import exrex
+
+from json_schema_fuzz import (MAX_REJECTED_SAMPLES, RejectionSamplingFailed,
+                              additional_properties, choose_properties,
+                              generate_excluding, generate_formatted,
+                              generate_json, random_enum, random_string)
+from json_schema_fuzz.formats import FORMAT_SAMPLERS
+
+_BOOLEANS = (True, False)
+'''
+
+# Shared default for missing subschemas so that
+# they all map to the same generated function
+EMPTY_SCHEMA = {}
+
+
+def is_integral(value):
+    """ Check if a number has no fractional part """
+    return value == int(value)
+
+
+class ModuleBuilder:
+    """ Accumulates constants and functions for a generated module """
+
+    def __init__(self):
+        self.constants = []
+        self.constant_names = {}
+        self.functions = []
+        self.node_names = {}
+        # Nodes that still need a function body
+        self.pending = []
+        # Keep nodes alive so their ids stay unique
+        self.nodes = []
+
+    def constant(self, value, source=None):
+        """
+        Get a module-level name holding value
+
+        source is the expression for value, literal(value) by default.
+        """
+        if source is None:
+            source = literal(value)
+        if isinstance(value, (bool, int, float)) or value is None:
+            return source
+        name = self.constant_names.get(source, None)
+        if name is None:
+            name = f"_C{len(self.constant_names)}"
+            self.constant_names[source] = name
+            self.constants.append(f"{name} = {source}")
+        return name
+
+    def node(self, schema):
+        """ Get the name of the function generating schema """
+        name = self.node_names.get(id(schema), None)
+        if name is None:
+            name = f"_node_{len(self.node_names)}"
+            self.node_names[id(schema)] = name
+            self.nodes.append(schema)
+            self.pending.append((name, schema))
+        return name
+
+    def add_function(self, name, body):
+        """ Add a function with no arguments """
+        self.functions.append(
+            f"def {name}():\n" + "".join(
+                f"    {line}\n" for line in body
+            )
+        )
+
+    def source(self):
+        """ Get module source """
+        return "\n".join(
+            [MODULE_HEADER] + self.constants
+        ) + "\n\n\n" + "\n\n".join(self.functions)
+
+
+def literal(value):
+    """ Get Python source for a JSON-like value """
+    if isinstance(value, Decimal):
+        return f"Decimal({str(value)!r})"
+    if isinstance(value, (list, tuple)):
+        return "(" + "".join(f"{literal(v)}, " for v in value) + ")"
+    if isinstance(value, dict):
+        return "{" + ", ".join(
+            f"{literal(k)}: {literal(v)}" for k, v in value.items()
+        ) + "}"
+    return repr(value)
+
+
+def schema_literal(value):
+    """ Get Python source for a schema, keeping lists as lists """
+    if isinstance(value, list):
+        return "[" + ", ".join(schema_literal(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ", ".join(
+            f"{literal(k)}: {schema_literal(v)}" for k, v in value.items()
+        ) + "}"
+    return literal(value)
+
+
+def multiple_expression(builder, minimum, maximum, multiple, as_int):
+    """
+    Get an expression for a random multiple in a range
+    that draws the same random numbers as random_multiple_in_range
+    """
+    first_multiple, num_multiples = multiples_in_range(
+        minimum, maximum, multiple)
+
+    if as_int and is_integral(multiple) and is_integral(first_multiple):
+        multiple, first_multiple = int(multiple), int(first_multiple)
+        if multiple == 1:
+            # randint(a, b) draws the same as randint(0, b - a)
+            return (f"random.randint({first_multiple}, "
+                    f"{first_multiple + num_multiples})")
+        return (f"{multiple} * random.randint(0, {num_multiples}) + "
+                f"({first_multiple})")
+
+    expression = (f"{builder.constant(multiple)} * "
+                  f"random.randint(0, {num_multiples}) + "
+                  f"{builder.constant(first_multiple)}")
+    if as_int:
+        return f"int({expression})"
+    return expression
+
+
+def rejection_body(builder, expression, not_multiple_of):
+    """ Body that resamples expression until it passes notMultipleOf """
+    if not not_multiple_of:
+        return [f"return {expression}"]
+    condition = " or ".join(
+        f"value % {builder.constant(num)} == 0"
+        for num in not_multiple_of
+    )
+    return [
+        "for _ in range(MAX_REJECTED_SAMPLES):",
+        f"    value = {expression}",
+        f"    if not ({condition}):",
+        "        return value",
+        "raise RejectionSamplingFailed()",
+    ]
+
+
+def integer_body(builder, schema):
+    """ Body generating an integer """
+    minimum, maximum, multiple_of, not_multiple_of = \
+        get_integer_range(schema)
+    expression = multiple_expression(
+        builder, minimum, maximum, multiple_of, as_int=True)
+    return rejection_body(builder, expression, not_multiple_of)
+
+
+def number_body(builder, schema):
+    """ Body generating a number """
+    minimum, maximum, multiple_of, not_multiple_of = \
+        get_number_range(schema)
+    if multiple_of is None:
+        return [
+            f"return Decimal(random.uniform("
+            f"{float(minimum)!r}, {float(maximum)!r}))"
+        ]
+    expression = multiple_expression(
+        builder, minimum, maximum, multiple_of, as_int=False)
+    return rejection_body(builder, expression, not_multiple_of)
+
+
+def string_body(builder, schema):
+    """ Body generating a string """
+    if schema.get("notFormat", None):
+        # Strings in excluded formats are rejected by random_string
+        name = builder.constant(schema, schema_literal(schema))
+        return [f"return random_string({name})"]
+
+    min_length = schema.get("minLength", 0)
+    max_length = schema.get("maxLength", min_length + 50)
+    pattern = schema.get("pattern", None)
+    string_format = schema.get("format", None)
+
+    if pattern is None and string_format in FORMAT_SAMPLERS:
+        min_length, max_length = get_format_length_range(schema)
+        return [
+            f"return generate_formatted(FORMAT_SAMPLERS[{string_format!r}], "
+            f"{int(min_length)}, {int(max_length)})"
+        ]
+    if pattern is None:
+        return [
+            "return ''.join(random.choices(string.ascii_lowercase, "
+            f"k=random.randint({int(min_length)}, {int(max_length)})))"
+        ]
+    return [
+        "for _ in range(MAX_REJECTED_SAMPLES):",
+        f"    value = exrex.getone({pattern!r})",
+        f"    if {int(min_length)} <= len(value) <= {int(max_length)}:",
+        "        return value",
+        "raise RejectionSamplingFailed()",
+    ]
+
+
+def boolean_body(builder, schema):
+    """ Body generating a boolean """
+    return ["return random.choice(_BOOLEANS)"]
+
+
+def null_body(builder, schema):
+    """ Body generating null """
+    return ["return None"]
+
+
+def object_body(builder, schema):
+    """ Body generating an object """
+    properties = schema.get("properties", {})
+    required = schema.get("required", [])
+
+    body = ["value = {}"]
+    # Choose the properties before generating any of them
+    if "minProperties" in schema or "maxProperties" in schema:
+        choice_schema = {
+            key: schema[key]
+            for key in ("required", "minProperties", "maxProperties")
+            if key in schema
+        }
+        choice_schema["properties"] = dict.fromkeys(properties, True)
+        name = builder.constant(choice_schema, schema_literal(choice_schema))
+        body.append(f"chosen = choose_properties({name})")
+        conditions = {
+            key: f"{key!r} in chosen" for key in properties
+            if key not in required
+        }
+    else:
+        conditions = {}
+        for key in properties:
+            if key not in required:
+                conditions[key] = f"include_{len(conditions)}"
+                body.append(
+                    f"{conditions[key]} = random.choice(_BOOLEANS)")
+
+    for key in properties:
+        subschema = property_schema(schema, key)
+        assignment = f"value[{key!r}] = {builder.node(subschema)}()"
+        if key in conditions:
+            body.append(f"if {conditions[key]}:")
+            body.append(f"    {assignment}")
+        else:
+            body.append(assignment)
+
+    if not ADDITIONAL_PROPERTIES_KEYS.isdisjoint(schema):
+        # Extra keys are drawn by the reference implementation
+        key_schema = {
+            key: schema[key] for key in sorted(ADDITIONAL_PROPERTIES_KEYS)
+            if key in schema
+        }
+        key_schema["properties"] = dict.fromkeys(properties, True)
+        name = builder.constant(key_schema, schema_literal(key_schema))
+        body.append("for key, subschema in "
+                    f"additional_properties({name}, len(value)):")
+        body.append("    value[key] = generate_json(subschema)")
+    body.append("return value")
+    return body
+
+
+def array_body(builder, schema):
+    """ Body generating an array """
+    items = schema.get("items", EMPTY_SCHEMA)
+    if isinstance(items, list):
+        # generate_json can't generate these either
+        raise NotImplementedError(
+            "Arrays with items given as a list are not supported")
+    max_items = schema.get("maxItems", 10)
+    min_items = schema.get("minItems", 0)
+    return [
+        f"return [{builder.node(items)}() for _ in range("
+        f"random.randint({int(min_items)}, {int(max_items)}))]"
+    ]
+
+
+TYPE_BODIES = {
+    "number": number_body,
+    "integer": integer_body,
+    "object": object_body,
+    "boolean": boolean_body,
+    "string": string_body,
+    "array": array_body,
+    "null": null_body,
+}
+
+
+def anyof_body(builder, schema):
+    """ Body of the function for a compiled anyOf """
+    branches = "(" + "".join(
+        f"{builder.node(branch)}, " for branch in schema["anyOf"]
+    ) + ")"
+    weights = schema.get("anyOfWeights", None)
+    if weights:
+        return [
+            f"return random.choices({branches}, "
+            f"weights={literal(weights)})[0]()"
+        ]
+    return [f"return random.choice({branches})()"]
+
+
+def enum_body(builder, schema):
+    """ Body of the function for an enum """
+    enum = schema["enum"]
+    if any(isinstance(value, (dict, list)) for value in enum):
+        # Mutable values are copied by random_enum
+        name = builder.constant(schema, schema_literal(schema))
+        return [f"return random_enum({name})"]
+    return [f"return random.choice({builder.constant(enum)})"]
+
+
+def node_body(builder, name, schema):
+    """
+    Body of the function for a compiled schema node.
+
+    Mirrors select_instance followed by the type-specific generator.
+    """
+    if schema is False:
+        return ["raise RejectionSamplingFailed()"]
+    if schema is True:
+        schema = {}
+
+    if schema.get("anyOf", None):
+        return anyof_body(builder, schema)
+    if schema.get("enum", None) is not None:
+        return enum_body(builder, schema)
+
+    possible_types = listify(schema.get("type", ALL_TYPES))
+    if "notEnum" in schema:
+        # Excluded values are rejected by the reference implementation
+        name = builder.constant(schema, schema_literal(schema))
+        return [
+            f"return generate_excluding({name}, "
+            f"random.choice({builder.constant(possible_types)}))"
+        ]
+
+    for instance_type in possible_types:
+        if instance_type not in TYPE_BODIES:
+            raise NotImplementedError(f"Unknown type {instance_type}")
+
+    if len(possible_types) == 1:
+        # Choosing from one type still draws a random number
+        return [f"random.choice({builder.constant(possible_types)})"] + \
+            TYPE_BODIES[possible_types[0]](builder, schema)
+
+    type_functions = []
+    for instance_type in possible_types:
+        type_name = f"{name}_{instance_type}"
+        builder.add_function(
+            type_name, TYPE_BODIES[instance_type](builder, schema))
+        type_functions.append(type_name)
+    return [
+        "return random.choice((" +
+        "".join(f"{type_name}, " for type_name in type_functions) +
+        "))()"
+    ]
+
+
+def generate_source(schema, function_name="generate"):
+    """
+    Get the source of a module defining a function with
+    no arguments that generates JSON conforming to schema
+
+    Raises NotImplementedError if the schema has parts that
+    can't be generated, such as items given as a list or
+    an unknown type.
+    """
+    schema = compile_schema(schema)
+    builder = ModuleBuilder()
+    root_name = builder.node(schema)
+    while builder.pending:
+        name, node = builder.pending.pop()
+        builder.add_function(name, node_body(builder, name, node))
+    builder.add_function(function_name, [f"return {root_name}()"])
+    return builder.source()
+
+
+def compile_generator(schema, function_name="generate"):
+    """ Generate, execute and return a specialized generator function """
+    namespace = {}
+    source = generate_source(schema, function_name)
+    # pylint: disable=exec-used
+    exec(compile(source, f"<json_schema_fuzz {function_name}>", "exec"),
+         namespace)
+    return namespace[function_name]
+
+
+def write_generator(schema, path, function_name="generate"):
+    """ Write a specialized generator module to path """
+    with open(path, "w") as stream:
+        stream.write(generate_source(schema, function_name))
@@ -0,0 +1,614 @@
+"""
+Schema cost analysis
+
+Estimates how expensive a schema is to compile and generate from
+without generating any samples: how many anyOf branches the
+oneOf and allOf expansion produces, the expected and worst-case
+size of generated documents, and which subschemas fall into
+slow paths such as rejection sampling.
+
+Sizes follow the choices generate_json makes: types and anyOf
+branches are picked uniformly (or by anyOfWeights), optional
+properties are included half the time and array lengths are
+uniform between minItems and maxItems (0 and 10 by default).
+"""
+import functools
+import operator
+from decimal import Decimal
+
+from . import (ADDITIONAL_KEY_LENGTH, MAX_ADDITIONAL_PROPERTIES,
+               compile_schema, get_format_length_range, get_integer_range,
+               get_number_range)
+from .formats import FORMAT_LENGTH_RANGES
+from .schema_operations import canonicalize_with_report, invert
+from .utils import ALL_TYPES, count_values, custom_json_dumps, gcd, listify
+
+# Don't compile schemas estimated to expand past this many branches
+MAX_COMPILED_BRANCHES = 100000
+
+# anyOf nodes with more branches than this are reported as slow
+LARGE_ANYOF = 1000
+
+# Probability that random_object includes an optional property
+OPTIONAL_PROPERTY_PROBABILITY = 0.5
+
+# Typical serialized length of a continuously sampled number
+NUMBER_BYTES = 18
+
+UNBOUNDED = float("inf")
+
+# Typical length of strings built by the format samplers
+FORMAT_LENGTHS = {
+    "date-time": 20,
+    "date": 10,
+    "time": 9,
+    "uuid": 36,
+    "email": 19,
+    "hostname": 12,
+    "ipv4": 13,
+    "ipv6": 38,
+    "uri": 30,
+}
+
+
+# pylint: disable=too-few-public-methods
+class Estimate:
+    """ Expected and worst-case size of generated documents """
+
+    def __init__(self, nodes, worst_nodes, size, worst_size):
+        self.nodes = nodes
+        self.worst_nodes = worst_nodes
+        self.size = size
+        self.worst_size = worst_size
+
+    def add(self, count, worst_count, child, overhead):
+        """
+        Add the expected and worst-case number of child
+        values, each with overhead extra bytes
+        """
+        self.nodes += count * child.nodes
+        self.worst_nodes += worst_count * child.worst_nodes
+        self.size += count * (overhead + child.size)
+        self.worst_size += worst_count * (overhead + child.worst_size)
+
+
+def product(values):
+    """ Multiply values together """
+    return functools.reduce(operator.mul, values, 1)
+
+
+def pointer(path, key):
+    """ Extend a JSON pointer with one reference token """
+    token = str(key).replace("~", "~0").replace("/", "~1")
+    return f"{path}/{token}"
+
+
+def walk_subschemas(schema, path="#"):
+    """
+    Yield (path, node) for a schema and every subschema under
+    properties, items, additionalItems, additionalProperties and anyOf
+    """
+    stack = [(path, schema)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node
+        if not isinstance(node, dict):
+            continue
+
+        children = []
+        for name, subschema in node.get("properties", {}).items():
+            children.append(
+                (pointer(pointer(path, "properties"), name), subschema))
+        items = node.get("items", None)
+        if isinstance(items, list):
+            children.extend(
+                (pointer(pointer(path, "items"), index), subschema)
+                for index, subschema in enumerate(items)
+            )
+        elif items is not None:
+            children.append((pointer(path, "items"), items))
+        if isinstance(items, list) and "additionalItems" in node:
+            children.append(
+                (pointer(path, "additionalItems"), node["additionalItems"]))
+        for pattern, subschema in node.get("patternProperties", {}).items():
+            children.append(
+                (pointer(pointer(path, "patternProperties"), pattern),
+                 subschema))
+        if "additionalProperties" in node:
+            children.append((
+                pointer(path, "additionalProperties"),
+                node["additionalProperties"],
+            ))
+        children.extend(
+            (pointer(pointer(path, "anyOf"), index), branch)
+            for index, branch in enumerate(node.get("anyOf", []))
+        )
+        # Visit in document order
+        stack.extend(reversed(children))
+
+
+def estimate_branches(schema):
+    """
+    Estimate how many anyOf branches a schema node is
+    expanded into when oneOf and allOf are merged away.
+
+    This is an upper bound: branches that turn out to be
+    impossible are dropped when the schema is compiled.
+    """
+    if isinstance(schema, bool):
+        return 1
+
+    count = 1
+    any_of = schema.get("anyOf", None)
+    if any_of:
+        count *= sum(estimate_branches(branch) for branch in any_of)
+
+    all_of = schema.get("allOf", None)
+    if all_of:
+        count *= product(estimate_branches(member) for member in all_of)
+
+    one_of = schema.get("oneOf", None)
+    if one_of:
+        # One option is true and the inverse of every other one is true
+        options = [estimate_branches(option) for option in one_of]
+        inverses = [estimate_branches(invert(option)) for option in one_of]
+        count *= sum(
+            options[index] * product(
+                inverses[:index] + inverses[index + 1:])
+            for index in range(len(one_of))
+        )
+    return count
+
+
+def count_compiled_branches(schema):
+    """ Count the branches of every anyOf in a compiled schema """
+    return sum(
+        len(node.get("anyOf", []))
+        for _, node in walk_subschemas(schema)
+        if isinstance(node, dict)
+    )
+
+
+def integer_digits(value):
+    """ Length of an integer written out """
+    return len(str(int(value)))
+
+
+def decimal_places(value):
+    """ Number of digits after the decimal point """
+    return max(0, -Decimal(str(value)).as_tuple().exponent)
+
+
+def estimate_integer(schema):
+    """ Estimate an integer """
+    minimum, maximum, _, _ = get_integer_range(schema)
+    size = max(integer_digits(minimum), integer_digits(maximum))
+    return Estimate(1, 1, size, size)
+
+
+def estimate_number(schema):
+    """ Estimate a number """
+    minimum, maximum, multiple_of, _ = get_number_range(schema)
+    if multiple_of is None:
+        return Estimate(1, 1, NUMBER_BYTES, NUMBER_BYTES)
+    size = max(integer_digits(minimum), integer_digits(maximum))
+    places = decimal_places(multiple_of)
+    if places:
+        size += places + 1
+    return Estimate(1, 1, size, size)
+
+
+def estimate_string(schema):
+    """ Estimate a string, including its quotes """
+    min_length = schema.get("minLength", 0)
+    max_length = schema.get("maxLength", min_length + 50)
+
+    length = FORMAT_LENGTHS.get(schema.get("format", None), None)
+    if length is not None and "pattern" not in schema:
+        min_length, max_length = get_format_length_range(schema)
+        max_length = min(
+            max_length, FORMAT_LENGTH_RANGES[schema["format"]][1])
+        length = min(max(length, min_length), max_length)
+        return Estimate(1, 1, 2 + float(length), 2 + float(max_length))
+
+    return Estimate(
+        1, 1,
+        2 + float(min_length + max_length) / 2,
+        2 + float(max_length),
+    )
+
+
+def estimate_value(value):
+    """ Estimate a fixed value from an enum """
+    nodes = count_values(value)
+    size = len(custom_json_dumps(value))
+    return Estimate(nodes, nodes, size, size)
+
+
+def estimate_boolean(schema):
+    """ Estimate a boolean """
+    return Estimate(1, 1, 4.5, 5)
+
+
+def estimate_null(schema):
+    """ Estimate null """
+    return Estimate(1, 1, 4, 4)
+
+
+def estimate_object(schema, estimates):
+    """ Estimate an object """
+    properties = schema.get("properties", {})
+    required = schema.get("required", [])
+
+    # Braces
+    total = Estimate(1, 1, 2, 2)
+    probability_empty = 1
+    num_properties = 0
+    for key, subschema in properties.items():
+        child = estimate(subschema, estimates)
+        probability = 1 if key in required \
+            else OPTIONAL_PROPERTY_PROBABILITY
+        probability_empty *= 1 - probability
+        num_properties += probability
+        # Key, ": " and ", "
+        total.add(probability, 1, child, len(custom_json_dumps(key)) + 4)
+
+    extra = estimate_additional_properties(
+        schema, num_properties, estimates)
+    if extra is not None:
+        count, worst_count, child = extra
+        # Key, ": " and ", "
+        total.add(count, worst_count, child, ADDITIONAL_KEY_LENGTH + 6)
+        if count > 0:
+            probability_empty = 0
+        worst_count += len(properties)
+    else:
+        worst_count = len(properties)
+
+    # There is one less ", " than there are properties
+    total.size -= 2 * (1 - probability_empty)
+    if worst_count:
+        total.worst_size -= 2
+    return total
+
+
+def estimate_additional_properties(schema, num_properties, estimates):
+    """
+    Estimate the keys added beyond an object's properties
+
+    Keys for patternProperties are counted as if they were as
+    long as random additionalProperties keys. Returns the
+    expected and worst-case number of keys and an estimate for
+    their values, or None if no keys are added.
+    """
+    sources = list(schema.get("patternProperties", {}).values())
+    additional = schema.get("additionalProperties", True)
+    if isinstance(additional, dict):
+        sources.append(additional)
+    min_properties = int(schema.get("minProperties", 0))
+
+    low = max(0, min_properties - num_properties)
+    if "maxProperties" in schema:
+        high = max(0, int(schema["maxProperties"]) - num_properties)
+        worst_high = int(schema["maxProperties"])
+    elif sources:
+        high = worst_high = max(low, MAX_ADDITIONAL_PROPERTIES)
+    else:
+        high = low
+        worst_high = min_properties
+    if not sources:
+        if additional is False or min_properties == 0:
+            return None
+        sources.append({})
+
+    children = [estimate(source, estimates) for source in sources]
+    child = Estimate(
+        sum(c.nodes for c in children) / len(children),
+        max(c.worst_nodes for c in children),
+        sum(c.size for c in children) / len(children),
+        max(c.worst_size for c in children),
+    )
+    return (min(low, high) + high) / 2, worst_high, child
+
+
+def estimate_array(schema, estimates):
+    """ Estimate an array """
+    items = schema.get("items", {})
+    if isinstance(items, list):
+        return estimate_tuple_array(schema, items, estimates)
+    min_items = int(schema.get("minItems", 0))
+    max_items = int(schema.get("maxItems", 10))
+    length = (min_items + max_items) / 2
+
+    # Lengths are uniform between min_items and max_items
+    probability_empty = 1 / (max_items + 1) if min_items == 0 else 0
+
+    child = estimate(items, estimates)
+    # Brackets and one less ", " than there are items
+    return Estimate(
+        1 + length * child.nodes,
+        1 + max_items * child.worst_nodes,
+        length * (child.size + 2) + 2 * probability_empty,
+        max_items * (child.worst_size + 2) + (2 if max_items == 0 else 0),
+    )
+
+
+def estimate_tuple_array(schema, items, estimates):
+    """
+    Estimate an array with a subschema for each of its first
+    items and additionalItems for the rest
+
+    Lengths are taken to be uniform between minItems and maxItems,
+    as for other arrays.
+    """
+    additional = schema.get("additionalItems", {})
+    min_items = int(schema.get("minItems", 0))
+    max_items = int(schema.get("maxItems", 10))
+    if additional is False:
+        max_items = min(max_items, len(items))
+    if max_items < min_items:
+        return Estimate(0, 0, 0, 0)
+    num_lengths = max_items - min_items + 1
+
+    # Brackets
+    total = Estimate(1, 1, 2, 2)
+    for index, subschema in enumerate(items[:max_items]):
+        # Fraction of lengths that include this index
+        probability = min(num_lengths, max_items - index) / num_lengths
+        total.add(probability, 1, estimate(subschema, estimates), 2)
+
+    # Expected number of items past the subschemas in items,
+    # summing length - len(items) over the lengths that have any
+    shortest = max(min_items, len(items))
+    if max_items > len(items):
+        count = (shortest + max_items - 2 * len(items)) * \
+            (max_items - shortest + 1) / 2 / num_lengths
+        total.add(count, max_items - len(items),
+                  estimate(additional, estimates), 2)
+
+    # There is one less ", " than there are items
+    if max_items > 0:
+        total.size -= 2 * (1 - (1 / num_lengths if min_items == 0 else 0))
+        total.worst_size -= 2
+    return total
+
+
+LEAF_ESTIMATES = {
+    "number": estimate_number,
+    "integer": estimate_integer,
+    "boolean": estimate_boolean,
+    "string": estimate_string,
+    "null": estimate_null,
+}
+
+
+def estimate_unconstrained():
+    """
+    Estimate a schema that allows anything
+
+    Arrays of anything can nest without limit, so the worst case
+    is unbounded. The expected size solves
+        E = (sum of other types + array of E) / number of types
+    """
+    leaves = [
+        LEAF_ESTIMATES[instance_type]({})
+        for instance_type in ALL_TYPES
+        if instance_type in LEAF_ESTIMATES
+    ]
+    # Empty object
+    leaves.append(Estimate(1, 1, 2, 2))
+    num_types = len(leaves) + 1
+    # Arrays of 0 to 10 items
+    length = 5
+    probability_empty = 1 / 11
+
+    # E = (A + 1 + length * E) / num_types
+    nodes = (sum(leaf.nodes for leaf in leaves) + 1) / \
+        (num_types - length)
+    # E = (A + length * (E + 2) + 2 * probability_empty) / num_types
+    size = (sum(leaf.size for leaf in leaves) +
+            2 * length + 2 * probability_empty) / \
+        (num_types - length)
+    return Estimate(nodes, UNBOUNDED, size, UNBOUNDED)
+
+
+def is_unconstrained(schema):
+    """ Check if a compiled schema node allows anything """
+    return schema is True or schema == {}
+
+
+def estimate(schema, estimates):
+    """
+    Estimate the documents generated from a compiled schema.
+
+    estimates memoizes results by node id, since compiled
+    schemas can share subschemas.
+    """
+    if is_unconstrained(schema):
+        return estimate_unconstrained()
+    if schema is False:
+        return Estimate(0, 0, 0, 0)
+
+    cached = estimates.get(id(schema), None)
+    if cached is not None:
+        return cached[1]
+
+    any_of = schema.get("anyOf", None)
+    if any_of:
+        weights = schema.get("anyOfWeights", [1] * len(any_of))
+        children = [estimate(branch, estimates) for branch in any_of]
+    elif "enum" in schema:
+        weights = [1] * len(schema["enum"])
+        children = [estimate_value(value) for value in schema["enum"]]
+    else:
+        weights = []
+        children = []
+        for instance_type in listify(schema.get("type", ALL_TYPES)):
+            weights.append(1)
+            if instance_type == "object":
+                children.append(estimate_object(schema, estimates))
+            elif instance_type == "array":
+                children.append(estimate_array(schema, estimates))
+            else:
+                children.append(LEAF_ESTIMATES[instance_type](schema))
+
+    total = float(sum(weights))
+    result = Estimate(
+        sum(w * c.nodes for w, c in zip(weights, children)) / total,
+        max(c.worst_nodes for c in children),
+        sum(w * c.size for w, c in zip(weights, children)) / total,
+        max(c.worst_size for c in children),
+    )
+    # Keep the node alive so its id isn't reused
+    estimates[id(schema)] = (schema, result)
+    return result
+
+
+def acceptance_probability(multiple_of, not_multiple_of):
+    """
+    Estimate the fraction of multiples of multiple_of that are
+    not multiples of any of not_multiple_of
+    """
+    probability = 1.0
+    for num in not_multiple_of:
+        # Multiples of both are multiples of the least common multiple
+        probability *= 1 - float(gcd(multiple_of, num) / num)
+    return probability
+
+
+def string_reasons(schema):
+    """ List the reasons generating a string from a schema may be slow """
+    reasons = []
+    if schema.get("notFormat", None):
+        reasons.append("notFormat uses rejection sampling")
+
+    if "pattern" in schema:
+        if "minLength" in schema or "maxLength" in schema:
+            reasons.append(
+                "pattern with length bounds uses rejection sampling")
+        else:
+            reasons.append("pattern is expanded with exrex")
+        return reasons
+
+    string_format = schema.get("format", None)
+    lengths = FORMAT_LENGTH_RANGES.get(string_format, None)
+    if lengths is None:
+        return reasons
+    min_length, max_length = get_format_length_range(schema)
+    if min_length > lengths[0] or max_length < lengths[1]:
+        reasons.append(f"format {string_format} with length bounds "
+                       "uses rejection sampling")
+    return reasons
+
+
+def not_multiple_of_reasons(schema, possible_types):
+    """ List the reasons notMultipleOf may make a number slow """
+    reasons = []
+    for instance_type in ("integer", "number"):
+        if instance_type not in possible_types:
+            continue
+        if instance_type == "integer":
+            _, _, multiple_of, not_multiple_of = get_integer_range(schema)
+        else:
+            _, _, multiple_of, not_multiple_of = get_number_range(schema)
+            if multiple_of is None:
+                continue
+        probability = acceptance_probability(multiple_of, not_multiple_of)
+        if probability <= 0:
+            reasons.append(f"notMultipleOf rejects every {instance_type}")
+        else:
+            reasons.append(
+                f"notMultipleOf rejection sampling takes "
+                f"{1 / probability:.1f} tries per {instance_type}")
+    return reasons
+
+
+def slow_reasons(schema):
+    """ List the reasons a compiled schema node may be slow """
+    if schema is False:
+        return ["schema can never be valid"]
+    if not isinstance(schema, dict):
+        return []
+
+    reasons = []
+    any_of = schema.get("anyOf", [])
+    if len(any_of) > LARGE_ANYOF:
+        reasons.append(f"anyOf with {len(any_of)} branches")
+    if any_of:
+        return reasons
+
+    possible_types = listify(schema.get("type", ALL_TYPES))
+
+    if "notEnum" in schema:
+        reasons.append("notEnum uses rejection sampling")
+
+    if "string" in possible_types:
+        reasons.extend(string_reasons(schema))
+
+    if schema.get("notMultipleOf", None):
+        reasons.extend(not_multiple_of_reasons(schema, possible_types))
+
+    if "array" in possible_types and isinstance(schema.get("items"), list):
+        reasons.append("items given as a list can't be generated")
+    return reasons
+
+
+def finite(value):
+    """ Convert unbounded values to None so they can be written as JSON """
+    return None if value == UNBOUNDED else value
+
+
+def explain_schema(schema):
+    """
+    Analyze the cost of generating from schema.
+
+    Returns a report with
+    - size: number of JSON values and serialized size of the
+      schema before and after canonicalizing it
+    - branches: estimated anyOf branch counts where oneOf,
+      allOf or anyOf expand a subschema into alternatives
+    - compiled_branches: the total number of anyOf branches
+      after compiling
+    - nodes and bytes: expected and worst-case number of JSON
+      values and serialized size of a generated document
+      (worst case is None if unbounded)
+    - slow: subschemas that are slow or impossible to generate
+
+    If the branch estimate exceeds MAX_COMPILED_BRANCHES the
+    schema isn't compiled and only branches is reported.
+    """
+    branches = []
+    for path, node in walk_subschemas(schema):
+        count = estimate_branches(node)
+        if count > 1:
+            branches.append({"path": path, "estimated": count})
+
+    report = {
+        "size": canonicalize_with_report(schema)[1],
+        "branches": branches,
+        "compiled_branches": None,
+        "nodes": None,
+        "bytes": None,
+        "slow": [],
+    }
+    if any(entry["estimated"] > MAX_COMPILED_BRANCHES
+           for entry in branches):
+        return report
+
+    compiled = compile_schema(schema)
+    report["compiled_branches"] = count_compiled_branches(compiled)
+
+    result = estimate(compiled, {})
+    report["nodes"] = {
+        "expected": result.nodes,
+        "worst": finite(result.worst_nodes),
+    }
+    report["bytes"] = {
+        "expected": result.size,
+        "worst": finite(result.worst_size),
+    }
+
+    for path, node in walk_subschemas(compiled):
+        for reason in slow_reasons(node):
+            report["slow"].append({"path": path, "reason": reason})
+    return report
@@ -0,0 +1,150 @@
+"""
+Samplers for string formats
+
+Each sampler builds a string in the given format directly
+from a few random numbers instead of expanding a regular
+expression. They use the random module so output is
+reproducible under random.seed.
+"""
+import datetime
+import ipaddress
+import random
+import re
+import string
+import uuid
+
+# Dates are drawn from this range
+FIRST_DATE = datetime.date(1970, 1, 1).toordinal()
+LAST_DATE = datetime.date(2099, 12, 31).toordinal()
+
+TOP_LEVEL_DOMAINS = ("com", "org", "net", "io", "dev")
+
+LABEL_CHARACTERS = string.ascii_lowercase + string.digits
+
+
+def random_label(max_length=10):
+    """ Random hostname label or email local part """
+    return "".join(random.choices(
+        LABEL_CHARACTERS, k=random.randint(1, max_length)))
+
+
+def random_date():
+    """ Random full-date, like 2021-03-14 """
+    return datetime.date.fromordinal(
+        random.randint(FIRST_DATE, LAST_DATE)).isoformat()
+
+
+def random_time():
+    """ Random full-time in UTC, like 15:09:26Z """
+    seconds = random.randrange(24 * 60 * 60)
+    return (f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:"
+            f"{seconds % 60:02d}Z")
+
+
+def random_date_time():
+    """ Random RFC 3339 date-time in UTC """
+    return f"{random_date()}T{random_time()}"
+
+
+def random_uuid():
+    """ Random version 4 UUID """
+    return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
+
+def random_hostname():
+    """ Random hostname with one or two labels and a top-level domain """
+    labels = [random_label() for _ in range(random.randint(1, 2))]
+    labels.append(random.choice(TOP_LEVEL_DOMAINS))
+    return ".".join(labels)
+
+
+def random_email():
+    """ Random email address """
+    return f"{random_label()}@{random_hostname()}"
+
+
+def random_ipv4():
+    """ Random IPv4 address in dotted decimal """
+    return str(ipaddress.IPv4Address(random.getrandbits(32)))
+
+
+def random_ipv6():
+    """ Random IPv6 address in its compressed form """
+    return str(ipaddress.IPv6Address(random.getrandbits(128)))
+
+
+def random_uri():
+    """ Random https URI with up to three path segments """
+    path = "".join(
+        "/" + random_label() for _ in range(random.randint(0, 3)))
+    return f"https://{random_hostname()}{path}"
+
+
+FORMAT_SAMPLERS = {
+    "date-time": random_date_time,
+    "date": random_date,
+    "time": random_time,
+    "uuid": random_uuid,
+    "email": random_email,
+    "hostname": random_hostname,
+    "ipv4": random_ipv4,
+    "ipv6": random_ipv6,
+    "uri": random_uri,
+}
+
+# Shortest and longest strings each sampler can build
+FORMAT_LENGTH_RANGES = {
+    "date-time": (20, 20),
+    "date": (10, 10),
+    "time": (9, 9),
+    "uuid": (36, 36),
+    # Local part, "@" and hostname
+    "email": (6, 36),
+    # One or two labels and a top-level domain
+    "hostname": (4, 25),
+    "ipv4": (7, 15),
+    "ipv6": (2, 39),
+    # "https://", hostname and up to three path segments
+    "uri": (12, 66),
+}
+
+
+def regex_checker(pattern):
+    """ Make a checker that matches a whole string against a regex """
+    regex = re.compile(pattern)
+    return lambda value: regex.fullmatch(value) is not None
+
+
+def address_checker(address_class):
+    """ Make a checker that parses a string as an IP address """
+    def check(value):
+        try:
+            address_class(value)
+        except ValueError:
+            return False
+        return True
+    return check
+
+
+DATE_REGEX = r"[0-9]{4}-[0-9]{2}-[0-9]{2}"
+TIME_REGEX = (
+    r"[0-9]{2}:[0-9]{2}:[0-9]{2}(\.[0-9]+)?([Zz]|[+-][0-9]{2}:[0-9]{2})")
+LABEL_REGEX = r"[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+
+# Check if a string may be in a format. Some strings that aren't
+# strictly valid, like the date 2021-02-30, are also accepted,
+# which is safe when they are used to reject strings for notFormat
+FORMAT_CHECKERS = {
+    "date-time": regex_checker(f"{DATE_REGEX}[Tt ]{TIME_REGEX}"),
+    "date": regex_checker(DATE_REGEX),
+    "time": regex_checker(TIME_REGEX),
+    "uuid": regex_checker(
+        r"[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-"
+        r"[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}"),
+    "email": regex_checker(r"[^@\s]+@[^@\s]+"),
+    "hostname": regex_checker(
+        f"{LABEL_REGEX}(\\.{LABEL_REGEX})*\\.?"),
+    "ipv4": address_checker(ipaddress.IPv4Address),
+    "ipv6": address_checker(ipaddress.IPv6Address),
+    "uri": regex_checker(r"[A-Za-z][A-Za-z0-9+.-]*:\S*"),
+}
@@ -0,0 +1,116 @@
+"""
+Iterative JSON generation
+
+Generates the same output as generate_json for the same random
+state, but keeps pending objects and arrays on an explicit stack
+instead of the call stack. This avoids the recursion limit on
+deeply nested schemas and the call overhead of recursing into
+every node.
+"""
+import random
+
+from . import (additional_properties, choose_properties, generate_excluding,
+               property_schema, random_boolean, random_enum, random_integer,
+               random_number, random_string, select_instance)
+
+
+def random_null(schema):
+    """Generate JSON null."""
+    return None
+
+
+LEAF_GENERATORS = {
+    "number": random_number,
+    "integer": random_integer,
+    "boolean": random_boolean,
+    "string": random_string,
+    "null": random_null,
+    "enum": random_enum,
+}
+
+# Kinds of stack frames
+OBJECT = 0
+ARRAY = 1
+
+
+def place_value(schema, container, key, stack):
+    """
+    Generate container[key] from schema.
+
+    Leaves are generated immediately. Objects and arrays are
+    created empty and a frame to fill them is pushed on the stack.
+    Returns True if a frame was pushed.
+    """
+    schema, instance_type = select_instance(schema)
+
+    # Rare enough that recursing is fine
+    if "notEnum" in schema:
+        container[key] = generate_excluding(schema, instance_type)
+        return False
+
+    leaf_generator = LEAF_GENERATORS.get(instance_type, None)
+    if leaf_generator is not None:
+        container[key] = leaf_generator(schema)
+        return False
+
+    if instance_type == "object":
+        value = container[key] = {}
+        pairs = [
+            (name, property_schema(schema, name))
+            for name in choose_properties(schema)
+        ]
+        stack.append([OBJECT, iter(pairs), value, schema])
+    elif instance_type == "array":
+        value = container[key] = []
+        length = random.randint(
+            schema.get("minItems", 0),
+            schema.get("maxItems", 10),
+        )
+        stack.append([ARRAY, schema.get("items", {}), length, value])
+    else:
+        raise NotImplementedError()
+    return True
+
+
+def generate_json_iterative(schema):
+    """Generate random JSON conforming to schema without recursion."""
+
+    # Holds the root so it can be assigned like any other value
+    holder = [None]
+
+    # Frames are one of
+    # [OBJECT, (key, subschema) iterator, object, schema]
+    # [ARRAY, items schema, remaining length, array]
+    # The schema of an object frame is set to None once
+    # its additional properties have been chosen
+    stack = []
+    place_value(schema, holder, 0, stack)
+    while stack:
+        frame = stack[-1]
+
+        if frame[0] == OBJECT:
+            _, pairs, value, schema = frame
+            for key, subschema in pairs:
+                # Continue with the new frame if one was pushed
+                if place_value(subschema, value, key, stack):
+                    break
+            else:
+                if schema is None:
+                    stack.pop()
+                    continue
+                # Continue with additional properties
+                frame[1] = iter(additional_properties(schema, len(value)))
+                frame[3] = None
+
+        else:
+            _, items, remaining, value = frame
+            while remaining > 0:
+                remaining -= 1
+                value.append(None)
+                if place_value(items, value, len(value) - 1, stack):
+                    break
+            frame[2] = remaining
+            if remaining == 0 and stack[-1] is frame:
+                stack.pop()
+
+    return holder[0]
@@ -0,0 +1,180 @@
+"""
+HTTP load generation
+
+Generates documents from a schema and POSTs them to a target
+URL over a pool of keep-alive connections.
+"""
+import http.client
+import math
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+from . import compile_schema, generate_json
+from .utils import custom_json_dumps
+
+
+def percentile(sorted_values, fraction):
+    """
+    Get a percentile from sorted values using the nearest-rank method
+
+    Returns None if there are no values.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class ConnectionWorker(threading.Thread):
+    """
+    Worker that sends requests over a single keep-alive connection
+
+    Each item taken from the queue is a (scheduled time, body) pair,
+    where the scheduled time is None if requests are not rate limited.
+    A None item stops the worker.
+    """
+
+    def __init__(self, url, work_queue, timeout):
+        super().__init__(daemon=True)
+        self.url = url
+        self.work_queue = work_queue
+        self.timeout = timeout
+        self.connection = None
+        self.latencies = []
+        self.status_counts = {}
+        self.errors = 0
+
+    def connect(self):
+        """ Open a new connection to the target """
+        if self.url.scheme == "https":
+            connection_class = http.client.HTTPSConnection
+        else:
+            connection_class = http.client.HTTPConnection
+        self.connection = connection_class(
+            self.url.netloc, timeout=self.timeout)
+
+    def send(self, body):
+        """ POST body and wait for the full response """
+        if self.connection is None:
+            self.connect()
+        target = self.url.path or "/"
+        if self.url.query:
+            target += "?" + self.url.query
+        self.connection.request(
+            "POST",
+            target,
+            body=body,
+            headers={"Content-Type": "application/json"},
+        )
+        response = self.connection.getresponse()
+        # The response must be read completely to reuse the connection
+        response.read()
+        if response.will_close:
+            self.connection.close()
+            self.connection = None
+        return response.status
+
+    def run(self):
+        while True:
+            item = self.work_queue.get()
+            if item is None:
+                break
+            scheduled_time, body = item
+
+            if scheduled_time is None:
+                start = time.perf_counter()
+            else:
+                delay = scheduled_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Time from the schedule, so requests delayed by a slow
+                # target count towards latency (coordinated omission)
+                start = scheduled_time
+            try:
+                status = self.send(body)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                if self.connection is not None:
+                    self.connection.close()
+                self.connection = None
+                continue
+            self.latencies.append(time.perf_counter() - start)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+        if self.connection is not None:
+            self.connection.close()
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+def run_load(
+        schema,
+        url,
+        count=1000,
+        concurrency=4,
+        rate=None,
+        timeout=10,
+):
+    """
+    POST count generated documents to url and report statistics.
+
+    Documents are sent over `concurrency` keep-alive connections.
+    If rate is given, requests are scheduled to be sent at that
+    many requests per second in total, and latency is measured
+    from the time each request was scheduled to be sent.
+
+    Latencies in the report are in milliseconds.
+    """
+    schema = compile_schema(schema)
+    target = urlparse(url)
+
+    work_queue = queue.Queue(maxsize=concurrency * 4)
+    workers = [
+        ConnectionWorker(target, work_queue, timeout)
+        for _ in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Generation happens on this thread because the
+    # generator uses the global random state
+    start = time.perf_counter()
+    for index in range(count):
+        if rate:
+            scheduled_time = start + index / rate
+        else:
+            scheduled_time = None
+        body = custom_json_dumps(generate_json(schema)).encode("utf-8")
+        work_queue.put((scheduled_time, body))
+    for _ in workers:
+        work_queue.put(None)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(
+        latency * 1000
+        for worker in workers
+        for latency in worker.latencies
+    )
+    status_counts = {}
+    for worker in workers:
+        for status, status_count in worker.status_counts.items():
+            status_counts[status] = \
+                status_counts.get(status, 0) + status_count
+
+    return {
+        "requests": len(latencies),
+        "errors": sum(worker.errors for worker in workers),
+        "status_counts": status_counts,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
@@ -0,0 +1,129 @@
+"""
+Mutation-based sample derivation
+
+Derives a new valid document from an existing one by
+regenerating a single random subtree. Only the containers
+along the path to that subtree are copied, so a mutation
+costs far less than generating a large document from scratch.
+"""
+import copy
+import random
+
+from . import generate_json, property_schema
+
+DESCEND_PROBABILITY = 0.5
+
+# Always descend into containers with more children than this,
+# so the cost of a mutation doesn't grow with the size of the
+# subtree that is regenerated
+ALWAYS_DESCEND_SIZE = 8
+
+# Marker for appending a new element to an array
+APPEND = object()
+
+
+def choose_slot(schema, value):
+    """
+    Choose a child of value to mutate along with its subschema.
+
+    Returns a (key, subschema) pair, where key is an object key,
+    an array index or APPEND. Returns None if the children
+    of value can't be mutated independently.
+    """
+    if not isinstance(schema, dict):
+        return None
+    # We don't know which branch generated the value
+    if any(key in schema for key in ("anyOf", "oneOf", "allOf")):
+        return None
+    # Enum values must be kept or replaced whole
+    if "enum" in schema or "notEnum" in schema:
+        return None
+
+    if isinstance(value, dict):
+        return choose_property(schema, value)
+    if isinstance(value, list):
+        return choose_element(schema, value)
+    return None
+
+
+def choose_property(schema, value):
+    """ Choose a property of an object to mutate, as in choose_slot """
+    properties = schema.get("properties", None)
+    if not properties:
+        return None
+    keys = list(properties)
+    if len(value) >= schema.get("maxProperties", float("inf")):
+        # Only regenerate properties, since adding one is not allowed
+        keys = [key for key in keys if key in value]
+        if not keys:
+            return None
+    key = random.choice(keys)
+    return key, property_schema(schema, key)
+
+
+def choose_element(schema, value):
+    """ Choose an element of an array to mutate, as in choose_slot """
+    items = schema.get("items", {})
+    if isinstance(items, list):
+        if len(value) == 0:
+            return None
+        index = random.randrange(len(value))
+        if index < len(items):
+            return index, items[index]
+        return index, schema.get("additionalItems", {})
+
+    can_append = len(value) < schema.get("maxItems", float("inf"))
+    if len(value) > 0 and (not can_append or random.random() < 0.5):
+        return random.randrange(len(value)), items
+    if can_append:
+        return APPEND, items
+    return None
+
+
+def mutate_json(schema, document, descend_probability=DESCEND_PROBABILITY):
+    """
+    Produce a new document by regenerating a random subtree of
+    a document generated from schema.
+
+    Mutations regenerate one object property, replace or append
+    one array element, or regenerate a leaf value. Containers with
+    more than ALWAYS_DESCEND_SIZE children are never regenerated
+    whole unless their schema requires it. Subtrees whose
+    schema is a combination (anyOf, oneOf, allOf) are regenerated
+    as a whole. For best performance schema should already be
+    compiled with compile_schema.
+
+    The input document is not modified.
+    """
+    # Holds the root so it can be replaced like any other child
+    holder = [document]
+    parent, parent_key = holder, 0
+    node_schema = schema
+
+    while True:
+        value = parent[parent_key]
+        slot = choose_slot(node_schema, value)
+        if slot is None:
+            parent[parent_key] = generate_json(node_schema)
+            return holder[0]
+
+        # Copy on write
+        value = copy.copy(value)
+        parent[parent_key] = value
+
+        key, child_schema = slot
+        if key is APPEND:
+            value.append(generate_json(child_schema))
+            return holder[0]
+
+        child = value.get(key, None) if isinstance(value, dict) \
+            else value[key]
+        if isinstance(child, (dict, list)) and (
+                len(child) > ALWAYS_DESCEND_SIZE or
+                random.random() < descend_probability
+        ):
+            parent, parent_key, node_schema = value, key, child_schema
+            continue
+
+        value[key] = generate_json(child_schema)
+        return holder[0]
@@ -0,0 +1,170 @@
+"""
+Pre-generated string pools
+
+Generating strings from a pattern walks the regex every time.
+When string pools are enabled, a fixed number of strings is
+generated once for each distinct pattern and length range, and
+each sample is drawn from that pool. This trades memory and
+value diversity for speed.
+"""
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+def sample_many(sampler, count, seed):
+    """
+    Call sampler count times with the random state seeded,
+    leaving the random state as it was
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return [sampler() for _ in range(count)]
+    finally:
+        random.setstate(state)
+
+
+def fill(sampler, size, seed, processes=None):
+    """
+    Generate size values with sampler from seed, split
+    over worker processes if processes is given
+    """
+    if not processes:
+        return sample_many(sampler, size, seed)
+
+    # Workers start from the same random state, so seed each chunk
+    rng = random.Random(seed)
+    chunk_sizes = [
+        size // processes + (1 if index < size % processes else 0)
+        for index in range(processes)
+    ]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        chunks = executor.map(
+            sample_many,
+            [sampler] * processes,
+            chunk_sizes,
+            [rng.getrandbits(64) for _ in range(processes)],
+        )
+        return [value for chunk in chunks for value in chunk]
+
+
+class StringPool:
+    """
+    Fixed-size pool of pre-generated strings
+
+    Values are generated from the pool's own random number
+    generator, seeded from key, so filling or refreshing a pool
+    never draws from the global random state. Only choosing a
+    value from the pool does.
+    """
+
+    def __init__(self, sampler, size, processes=None, key=None):
+        self.sampler = sampler
+        self.size = size
+        self.processes = processes
+        self.rng = random.Random(repr(key))
+        self.values = fill(
+            sampler, size, self.rng.getrandbits(64), processes)
+
+    def sample(self):
+        """ Draw a value from the pool """
+        return random.choice(self.values)
+
+    def refresh(self):
+        """
+        Replace the pool with newly generated values
+
+        Values are generated in at least one worker process, so
+        that refreshing from a background thread doesn't touch
+        the random state of the generating thread.
+        """
+        # Swap in a complete list so readers never see a partial pool
+        self.values = fill(
+            self.sampler, self.size, self.rng.getrandbits(64),
+            self.processes or 1)
+
+
+class PoolRefresher(threading.Thread):
+    """ Background thread that periodically refreshes pools """
+
+    def __init__(self, pools, interval):
+        super().__init__(daemon=True)
+        self.pools = pools
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            for pool in list(self.pools.values()):
+                pool.refresh()
+
+    def stop(self):
+        """ Stop refreshing """
+        self.stopped.set()
+
+
+class StringPools:
+    """ String pools keyed by pattern and length range """
+
+    def __init__(self):
+        self.size = None
+        self.processes = None
+        self.pools = {}
+        self.lock = threading.Lock()
+        self.refresher = None
+
+    @property
+    def enabled(self):
+        """ Whether strings should be drawn from pools """
+        return self.size is not None
+
+    def get(self, key, sampler):
+        """ Get the pool for key, filling it with sampler if needed """
+        pool = self.pools.get(key, None)
+        if pool is None:
+            with self.lock:
+                pool = self.pools.get(key, None)
+                if pool is None:
+                    pool = StringPool(
+                        sampler, self.size, self.processes, key)
+                    self.pools[key] = pool
+        return pool
+
+    def enable(self, size=1000, processes=None, refresh_interval=None):
+        """ Start drawing strings from pools """
+        self.disable()
+        self.size = size
+        self.processes = processes
+        if refresh_interval:
+            self.refresher = PoolRefresher(self.pools, refresh_interval)
+            self.refresher.start()
+
+    def disable(self):
+        """ Stop using pools and free them """
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher = None
+        self.size = None
+        self.pools.clear()
+
+
+STRING_POOLS = StringPools()
+
+
+def enable_string_pools(size=1000, processes=None, refresh_interval=None):
+    """
+    Draw strings with a pattern or length bounds from pools
+    of `size` pre-generated values.
+
+    Pools are filled the first time they are needed, using
+    `processes` worker processes if given. If refresh_interval
+    is given, pools are regenerated in a background thread
+    every refresh_interval seconds.
+    """
+    STRING_POOLS.enable(size, processes, refresh_interval)
+
+
+def disable_string_pools():
+    """ Generate every string from scratch again """
+    STRING_POOLS.disable()
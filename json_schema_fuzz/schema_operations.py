@@ -1,9 +1,25 @@
 """ Operations on schemas """
-import copy
 import itertools
+import re
+import threading
+from decimal import Decimal
 from typing import Any, Dict, List
 
-from .utils import ALL_TYPES, lcm, listify
+from .formats import FORMAT_CHECKERS
+from .utils import (ALL_TYPES, canonical_json, count_values, custom_json_dumps,
+                    lcm, listify, map_subschemas, schema_hash)
+
+# Only look for subsumed branches in anyOf lists up to this long
+SUBSUMPTION_LIMIT = 200
+
+# Subschemas nested deeper than this below the schemas given to merge
+# or invert are left as an allOf or not, which keeps the recursion
+# bounded. compile_schema resolves them one level at a time.
+MAX_NESTING = 50
+
+# Keywords whose meaning depends on other keywords in the same schema,
+# so a branch with them can't be compared keyword by keyword
+CONTEXT_DEPENDENT_KEYWORDS = {"additionalProperties", "additionalItems"}
 
 
 def get_from_all(
@@ -52,24 +68,547 @@ def merge_listify(values):
     return output
 
 
+# pylint: disable=too-few-public-methods
+class Nesting(threading.local):
+    """ Depth of the subschemas being merged or inverted by this thread """
+    depth = 0
+
+
+NESTING = Nesting()
+
+
+def merge_subschemas(*values):
+    """
+    Merge schemas from within a merge or invert, or
+    leave them in an allOf if nested too deep
+    """
+    if NESTING.depth >= MAX_NESTING:
+        return {"allOf": list(values)}
+    NESTING.depth += 1
+    try:
+        return merge(*values)
+    finally:
+        NESTING.depth -= 1
+
+
+def invert_subschema(schema):
+    """
+    Invert a schema from within a merge or invert,
+    or leave it under not if nested too deep
+    """
+    if NESTING.depth >= MAX_NESTING and not isinstance(schema, bool):
+        return {"not": schema}
+    NESTING.depth += 1
+    try:
+        return invert(schema)
+    finally:
+        NESTING.depth -= 1
+
+
+def merge_not(values):
+    """ Merge not subschemas, since not a and not b is not (a or b) """
+    if len(values) == 1:
+        return values[0]
+    return {"anyOf": list(values)}
+
+
+def flatten_anyof(branches):
+    """ Yield branches, replacing anyOf-only branches with their own """
+    stack = list(reversed(branches))
+    while stack:
+        branch = stack.pop()
+        if isinstance(branch, dict) and branch.keys() == {"anyOf"}:
+            stack.extend(reversed(branch["anyOf"]))
+        else:
+            yield branch
+
+
+def same_value(first, second):
+    """ Test if two JSON values are equal, telling True from 1 """
+    if first is second:
+        return True
+    # pylint: disable=unidiomatic-typecheck
+    if type(first) is not type(second) or first != second:
+        return False
+    if isinstance(first, dict):
+        return all(
+            same_value(value, second[key]) for key, value in first.items()
+        )
+    if isinstance(first, list):
+        return all(same_value(*pair) for pair in zip(first, second))
+    return True
+
+
+def subsumes(general, specific):
+    """
+    Test if a branch has a subset of the keywords
+    of another with the same values
+    """
+    if CONTEXT_DEPENDENT_KEYWORDS.isdisjoint(general):
+        if not general.keys() <= specific.keys():
+            return False
+    elif general.keys() != specific.keys():
+        return False
+    return all(
+        same_value(value, specific[key]) for key, value in general.items()
+    )
+
+
+def remove_subsumed(branches):
+    """
+    Drop branches that have every keyword of another
+    branch with the same value, and so only allow
+    values that the other branch allows as well.
+    This includes duplicates.
+    """
+    subsuming = []
+    subsumed = set()
+    # Less constrained branches first
+    for index in sorted(range(len(branches)), key=lambda i: len(branches[i])):
+        branch = branches[index]
+        if any(subsumes(branches[other], branch) for other in subsuming):
+            subsumed.add(index)
+        else:
+            subsuming.append(index)
+    return [
+        branch for index, branch in enumerate(branches)
+        if index not in subsumed
+    ]
+
+
+def remove_duplicates(branches):
+    """ Drop branches equal to an earlier one by structural hash """
+    output = []
+    seen = set()
+    for branch in branches:
+        key = schema_hash(branch)
+        if key not in seen:
+            seen.add(key)
+            output.append(branch)
+    return output
+
+
+def canonical_anyof(branches):
+    """
+    Simplify a list of anyOf branches without changing what they allow
+
+    Nested anyOf-only branches are flattened, False branches are
+    dropped and branches subsumed by another branch are removed.
+    Lists too long to compare every pair of branches only have
+    duplicates removed, by structural hash. Returns True if a
+    branch allows anything, otherwise the remaining branches (an
+    empty list if none can be valid).
+    """
+    output = []
+    for branch in flatten_anyof(branches):
+        if branch is False:
+            continue
+        if branch is True or branch == {}:
+            return True
+        output.append(branch)
+
+    if len(output) > SUBSUMPTION_LIMIT:
+        return remove_duplicates(output)
+    if len(output) > 1:
+        return remove_subsumed(output)
+    return output
+
+
 def combine_anyof_lists(*values):
     """
     Merge lists of anyOf values so that they all must
     be true. This is done by merging all the permutations
     of the lists.
     """
-    values = list(filter(len, values))
-    if len(values) == 1:
-        return values[0]
+    lists = []
+    for value in filter(len, values):
+        branches = canonical_anyof(value)
+        # This list is always satisfied
+        if branches is True:
+            continue
+        lists.append(branches)
+
+    if len(lists) == 0:
+        return [True]
+    if len(lists) == 1:
+        return lists[0]
 
     output = []
-    for anyof_permutation in itertools.product(*values):
-        output.append(merge(*anyof_permutation))
+    for anyof_permutation in itertools.product(*lists):
+        output.append(merge_subschemas(*anyof_permutation))
     return output
 
-# pylint: disable=too-many-branches
-# pylint: disable=too-many-locals
-# pylint: disable=too-many-statements
+
+# Returned by merging functions when the
+# keyword should be left out of the merged schema
+OMIT = object()
+
+# Returned by merge_format when strings can't satisfy every format
+CONFLICTING_FORMATS = object()
+
+
+def merge_additional_properties(values):
+    """ Merge additionalProperties subschemas """
+    return merge_subschemas(*values)
+
+
+def merge_type(values):
+    """
+    Merge types using the intersection of the provided
+    lists. The only exception to this is with number because
+    number is an integer.
+    """
+    # Convert to sets
+    type_values = [set(listify(type_value)) for type_value in values]
+
+    has_integer = any(
+        "integer" in type_value for type_value in type_values
+    )
+    if has_integer:
+        # Convert all numbers to integers
+        for type_value in type_values:
+            if "number" in type_value:
+                type_value.remove("number")
+                type_value.add("integer")
+
+    # Merge using intersection
+    return list(set.intersection(*type_values))
+
+
+def merge_anyof(values):
+    """ Merge anyOf lists so that one value from each must be true """
+    return combine_anyof_lists(*values)
+
+
+def merge_oneof(values):
+    """
+    Convert oneOf lists to a list of anyOf values where
+    exactly one value from each oneOf list is true
+    """
+
+    # Build inverse values for all schemas provided
+    inverted_oneof_values = []
+    for one_of_list in values:
+        inverted_oneof_values.append([
+            invert_subschema(s) for s in one_of_list
+        ])
+
+    new_anyof_values = []
+
+    # Build permutations where one value is true and the rest are false
+    one_of_indexes = [range(len(v)) for v in values]
+    # During this permutation, use the index provided as the one "true"
+    # and have the rest of the indexes be false
+    for true_indexes in itertools.product(*one_of_indexes):
+        # Copy the lists of inverted one_of values. merge doesn't
+        # modify its input, so the subschemas can be shared.
+        current_permutation = [
+            list(inverted_values) for inverted_values in inverted_oneof_values
+        ]
+
+        # Replace inverted values with given values at the true_indexes
+        for outer_list_index, _ in enumerate(current_permutation):
+            inner_list_index = true_indexes[outer_list_index]
+            current_permutation[outer_list_index][inner_list_index] = \
+                values[outer_list_index][inner_list_index]
+
+        # Merge and save
+        denested_schemas = [
+            subschema for outer_list in current_permutation
+            for subschema in outer_list
+        ]
+        new_anyof_values.append(merge_subschemas(*denested_schemas))
+
+    return new_anyof_values
+
+
+def merge_enum(values):
+    """ Keep the values that are in every enum """
+    other_enums = [
+        {canonical_json(value) for value in enum}
+        for enum in values[1:]
+    ]
+    return [
+        value for value in values[0]
+        if all(canonical_json(value) in enum for enum in other_enums)
+    ]
+
+
+def merge_not_enum(values):
+    """ Exclude the values of every notEnum """
+    return [value for not_enum in values for value in not_enum]
+
+
+def merge_format(values):
+    """
+    Keep the format if all values agree
+
+    No string has two different formats, so
+    CONFLICTING_FORMATS is returned if they don't.
+    """
+    if any(value != values[0] for value in values[1:]):
+        return CONFLICTING_FORMATS
+    return values[0]
+
+
+def merge_not_format(values):
+    """ Exclude the formats of every notFormat """
+    return list(dict.fromkeys(
+        string_format for not_format in values
+        for string_format in not_format
+    ))
+
+
+def merge_string_formats(schema):
+    """
+    Rule out strings from a merged schema with different
+    formats or a format that is also in its notFormat
+
+    Returns False if the schema allows no other type.
+    """
+    string_format = schema.get("format", None)
+    if string_format is CONFLICTING_FORMATS or \
+            string_format in schema.get("notFormat", []):
+        del schema["format"]
+        return without_type(schema, "string")
+    return schema
+
+
+def without_type(schema, instance_type):
+    """
+    Remove a type from the types a schema allows
+
+    Returns False if the schema allows no other type.
+    """
+    types = [
+        value for value in listify(schema.get("type", ALL_TYPES))
+        if value != instance_type
+    ]
+    if not types:
+        return False
+    schema["type"] = types
+    return schema
+
+
+# pylint: disable=too-many-return-statements
+def instance_types(value):
+    """ Get the set of JSON types a value belongs to """
+    if isinstance(value, bool):
+        return {"boolean"}
+    if value is None:
+        return {"null"}
+    if isinstance(value, (int, float, Decimal)):
+        if value == int(value):
+            return {"integer", "number"}
+        return {"number"}
+    if isinstance(value, str):
+        return {"string"}
+    if isinstance(value, list):
+        return {"array"}
+    return {"object"}
+
+
+def is_multiple(value, multiple):
+    """ Check if value is a multiple of multiple, exactly for decimals """
+    return Decimal(str(value)) % Decimal(str(multiple)) == 0
+
+
+# pylint: disable=too-many-return-statements
+def satisfies(schema, value):
+    """
+    Check a value against the type, numeric and
+    string keywords of a schema
+    """
+    types = schema.get("type", None)
+    value_types = instance_types(value)
+    if types is not None and value_types.isdisjoint(listify(types)):
+        return False
+
+    if "number" in value_types:
+        bounds = [
+            ("minimum", lambda bound: value >= bound),
+            ("maximum", lambda bound: value <= bound),
+            ("exclusiveMinimum", lambda bound: value > bound),
+            ("exclusiveMaximum", lambda bound: value < bound),
+        ]
+        for keyword, check in bounds:
+            bound = schema.get(keyword, None)
+            if bound is not None and not check(bound):
+                return False
+        multiple_of = schema.get("multipleOf", None)
+        if multiple_of and not is_multiple(value, multiple_of):
+            return False
+        for num in listify(schema.get("notMultipleOf", [])):
+            if is_multiple(value, num):
+                return False
+
+    if "string" in value_types:
+        if len(value) < schema.get("minLength", 0):
+            return False
+        if len(value) > schema.get("maxLength", len(value)):
+            return False
+        pattern = schema.get("pattern", None)
+        if pattern is not None and not re.search(pattern, value):
+            return False
+        if has_format(value, schema.get("notFormat", [])):
+            return False
+
+    return True
+
+
+def has_format(value, formats):
+    """ Check if a string may be in any of the given formats """
+    return any(
+        FORMAT_CHECKERS[string_format](value)
+        for string_format in formats
+        if string_format in FORMAT_CHECKERS
+    )
+
+
+def enum_values(schema):
+    """
+    Get the values allowed by the enum and const of a
+    schema that also satisfy its other keywords
+
+    Values are checked against type, numeric bounds, string
+    lengths, pattern and notFormat, and must not be in notEnum.
+    """
+    enums = []
+    if "enum" in schema:
+        enums.append(schema["enum"])
+    if "const" in schema:
+        enums.append([schema["const"]])
+    excluded = {
+        canonical_json(value) for value in schema.get("notEnum", [])
+    }
+    return [
+        value for value in merge_enum(enums)
+        if canonical_json(value) not in excluded and
+        satisfies(schema, value)
+    ]
+
+
+def merge_properties(values):
+    """ Merge properties by merging the subschemas for each key """
+    merged_properties = {}
+    all_keys = {
+        key
+        for d in values
+        for key in d.keys()
+    }
+    for key in all_keys:
+        all_values = [d.get(key, {}) for d in values]
+        merged_properties[key] = merge_subschemas(*all_values)
+    return merged_properties
+
+
+def merge_any_true(values):
+    """ Set the keyword to True if any value is true """
+    if any(values):
+        return True
+    return OMIT
+
+
+def merge_items(values):
+    """ Merge items given as a single subschema or as a list """
+    if isinstance(values[0], list):
+        largest_index = max(len(items) for items in values)
+        merged_items = []
+        for index in range(largest_index):
+            merged_items.append(
+                merge_subschemas(*[
+                    get_index_or_default(items, index, {})
+                    for items in values
+                ])
+            )
+        return merged_items
+    else:
+        return merge_subschemas(*values)
+
+
+# Dictionary of properties and how
+# to merge them together
+PROPERTY_MERGING_FUNCTIONS = {
+    # Combinations
+    "allOf": merge_listify,
+    "not": merge_not,
+    "anyOf": merge_anyof,
+    "oneOf": merge_oneof,
+
+    # Types
+    "type": merge_type,
+
+    # Numbers
+    "maximum": min,
+    "exclusiveMaximum": min,
+    "minimum": max,
+    "exclusiveMinimum": max,
+    "multipleOf": lcm,
+    "notMultipleOf": merge_listify,
+
+    # String
+    "minLength": max,
+    "maxLength": min,
+    "format": merge_format,
+    "notFormat": merge_not_format,
+
+    # Values
+    "enum": merge_enum,
+    "notEnum": merge_not_enum,
+
+    # Object
+    "properties": merge_properties,
+    "patternProperties": merge_properties,
+    "required": merge_listify,
+    "minProperties": max,
+    "maxProperties": min,
+    "additionalProperties": merge_additional_properties,
+    "someAdditionalProperty": merge_listify,
+
+    # Array
+    "items": merge_items,
+    "contains": merge_listify,
+    "hasDuplicates": merge_any_true,
+    "uniqueItems": merge_any_true,
+}
+
+
+def merge_weighted(schemas):
+    """
+    Merge schemas where some have a weighted anyOf
+
+    The weighted anyOf lists are taken out and the rest is merged.
+    The result is a weighted anyOf with one branch for each
+    combination of weighted branches, each merged with the rest,
+    whose weight is the product of their weights.
+    """
+    rest = []
+    weighted_lists = []
+    for schema in schemas:
+        if isinstance(schema, dict) and "anyOfWeights" in schema:
+            schema = dict(schema)
+            any_of = schema.pop("anyOf", [])
+            weights = schema.pop("anyOfWeights")
+            if len(weights) != len(any_of):
+                raise ValueError(
+                    "anyOfWeights must have one weight per anyOf branch")
+            weighted_lists.append(list(zip(any_of, weights)))
+        rest.append(schema)
+
+    base = merge(*rest)
+    if base is False:
+        return False
+
+    branches = []
+    branch_weights = []
+    for combination in itertools.product(*weighted_lists):
+        branches.append(merge_subschemas(
+            base, *[branch for branch, _ in combination]))
+        weight = 1
+        for _, branch_weight in combination:
+            weight *= branch_weight
+        branch_weights.append(weight)
+    return {"anyOf": branches, "anyOfWeights": branch_weights}
 
 
 def merge(
@@ -85,155 +624,181 @@ def merge(
     This is equivalent to an allOf with the provided schemas.
     """
 
-    # If there is a False, the combined schema must be false
-    if any(schema is False for schema in schemas):
-        return False
+    # Weights only apply to the branches they were given for
+    if any(
+            isinstance(schema, dict) and "anyOfWeights" in schema
+            for schema in schemas
+    ):
+        return merge_weighted(schemas)
 
-    # Replace True with the empty schema
-    schemas = [
-        {} if schema is True
-        else schema
-        for schema in schemas
-    ]
+    buckets = collect_keyword_values(schemas)
+    if buckets is False:
+        return False
 
+    # Reduce each bucket
+    one_of_values = buckets.pop("oneOf", None)
     merged_schema = {}
+    for prop, values in buckets.items():
+        merged_value = PROPERTY_MERGING_FUNCTIONS[prop](values)
+        if merged_value is not OMIT:
+            merged_schema[prop] = merged_value
 
-    # Dictionary of properties and how
-    # to merge them together
-    property_merging_functions = {
-        # Combinations
-        "allOf": merge_listify,
-
-        # Numbers
-        "maximum": min,
-        "exclusiveMaximum": min,
-        "minimum": max,
-        "exclusiveMinimum": max,
-        "multipleOf": lcm,
-        "notMultipleOf": merge_listify,
-
-        # String
-        "minLength": max,
-        "maxLength": min,
-
-        # Object
-        "required": merge_listify,
-        "additionalProperties": lambda values: merge(*values),
-        "someAdditionalProperty": merge_listify,
-
-        # Array
-        "contains": merge_listify,
-    }
-
-    # Process properties from dictionary
-    for prop, merge_function in property_merging_functions.items():
-        values = get_from_all(schemas, prop)
-        if values:
-            merged_schema[prop] = merge_function(values)
-
-    # Process remaining properties that have more
-    # complex merging requirements
-
-    # When merging types use the intersection of the provided
-    # lists. The only exception to this is with number because
-    # number is an integer.
-    type_values = get_from_all(schemas, "type")
-    if type_values:
-        # Convert to sets
-        type_values = [set(listify(type_value)) for type_value in type_values]
-
-        has_integer = any(
-            "integer" in type_value for type_value in type_values
-        )
-        if has_integer:
-            # Convert all numbers to integers
-            for type_value in type_values:
-                if "number" in type_value:
-                    type_value.remove("number")
-                    type_value.add("integer")
-
-        # Merge using intersection
-        merged_schema["type"] = list(
-            set.intersection(*type_values)
-        )
+    merged_schema = merge_string_formats(merged_schema)
+    if merged_schema is False:
+        return False
 
-    any_of_values = get_from_all(schemas, "anyOf")
-    if any_of_values:
-        merged_schema["anyOf"] = combine_anyof_lists(*any_of_values)
+    # Only keep enum values allowed by the other keywords
+    if "enum" in merged_schema:
+        merged_schema["enum"] = enum_values(merged_schema)
 
-    one_of_values = get_from_all(schemas, "oneOf")
+    # oneOf becomes anyOf values that must hold
+    # together with any existing anyOf
     if one_of_values:
-
-        # Build inverse values for all schemas provided
-        inverted_oneof_values = []
-        for one_of_list in one_of_values:
-            inverted_oneof_values.append([
-                invert(s) for s in one_of_list
-            ])
-
-        new_anyof_values = []
-
-        # Build permutations where one value is true and the rest are false
-        one_of_indexes = [range(len(v)) for v in one_of_values]
-        # During this permutation, use the index provided as the one "true"
-        # and have the rest of the indexes be false
-        for true_indexes in itertools.product(*one_of_indexes):
-            # Make a copy of the inverted one_of value
-            current_permutation = copy.deepcopy(inverted_oneof_values)
-
-            # Replace inverted values with given values at the true_indexes
-            for outer_list_index, _ in enumerate(current_permutation):
-                inner_list_index = true_indexes[outer_list_index]
-                current_permutation[outer_list_index][inner_list_index] = \
-                    one_of_values[outer_list_index][inner_list_index]
-
-            # Merge and save
-            denested_schemas = [
-                subschema for outer_list in current_permutation
-                for subschema in outer_list
-            ]
-            new_anyof_values.append(merge(*denested_schemas))
-
         existing_anyof = merged_schema.get("anyOf", [])
         merged_schema["anyOf"] = combine_anyof_lists(
-            existing_anyof, new_anyof_values)
-
-    properties_values = get_from_all(schemas, "properties")
-    if properties_values:
-        merged_schema["properties"] = {}
-        all_keys = {
-            key
-            for d in properties_values
-            for key in d.keys()
-        }
-        for key in all_keys:
-            all_values = [d.get(key, {}) for d in properties_values]
-            merged_schema["properties"][key] = merge(*all_values)
-
-    has_duplicates_values = get_from_all(schemas, "hasDuplicates")
-    if has_duplicates_values and any(has_duplicates_values):
-        merged_schema["hasDuplicates"] = True
-
-    unique_items_values = get_from_all(schemas, "uniqueItems")
-    if unique_items_values and any(unique_items_values):
-        merged_schema["uniqueItems"] = True
-
-    items_values = get_from_all(schemas, "items")
-    if items_values:
-        if isinstance(items_values[0], list):
-            largest_index = max([len(items) for items in items_values])
-            merged_schema["items"] = []
-            for index in range(largest_index):
-                merged_schema["items"].append(
-                    merge(*[
-                        get_index_or_default(items, index, {})
-                        for items in items_values
-                    ])
-                )
-        else:
-            merged_schema["items"] = merge(*items_values)
+            existing_anyof, merge_oneof(one_of_values))
+
+    return merge_canonical_anyof(merged_schema)
+
+
+def collect_keyword_values(schemas):
+    """
+    Collect the values for each keyword in a
+    single pass over the schemas
+
+    Returns False if one of the schemas is False.
+    """
+    buckets = {}
+    for schema in schemas:
+        # If there is a False, the combined schema must be false
+        if schema is False:
+            return False
+        # True is the empty schema
+        if schema is True:
+            continue
+        for prop, value in schema.items():
+            # const is an enum with one value
+            if prop == "const":
+                prop, value = "enum", [value]
+            elif value is None or prop not in PROPERTY_MERGING_FUNCTIONS:
+                continue
+            bucket = buckets.get(prop, None)
+            if bucket is None:
+                buckets[prop] = [value]
+            else:
+                bucket.append(value)
+    return buckets
+
+
+def merge_canonical_anyof(schema):
+    """
+    Canonicalize the anyOf of a merged schema and
+    merge a single remaining branch into the schema
+    """
+    any_of = schema.pop("anyOf", None)
+    if any_of is None:
+        return schema
+    any_of = canonical_anyof(any_of)
+    if any_of is True:
+        # The anyOf is always satisfied
+        return schema
+    if len(any_of) == 0:
+        return False
+    if len(any_of) == 1:
+        return merge_subschemas(schema, any_of[0])
+    schema["anyOf"] = any_of
+    return schema
+
+
+def canonical_allof(members):
+    """
+    Simplify a list of allOf members without changing what they allow
+
+    Returns False if a member never allows anything, otherwise the
+    members without nested allOf-only members, True members and
+    duplicates.
+    """
+    output = []
+    seen = set()
+    stack = list(reversed(members))
+    while stack:
+        member = stack.pop()
+        if isinstance(member, dict) and member.keys() == {"allOf"}:
+            stack.extend(reversed(member["allOf"]))
+            continue
+        if member is False:
+            return False
+        if member is True or member == {}:
+            continue
+        key = schema_hash(member)
+        if key not in seen:
+            seen.add(key)
+            output.append(member)
+    return output
+
 
-    return merged_schema
+# pylint: disable=too-many-return-statements
+def canonicalize(schema):
+    """
+    Rewrite a schema into a smaller equivalent one.
+
+    At every level anyOf lists are flattened and stripped of False,
+    duplicate and subsumed branches, and allOf lists are flattened
+    and stripped of True and duplicate members. Combinations with a
+    single alternative are replaced by it when nothing else is in
+    the schema. oneOf is left alone, since dropping a duplicate
+    would change which values match exactly one option.
+
+    The input schema is not modified.
+    """
+    if isinstance(schema, bool):
+        return schema
+
+    output = map_subschemas(schema, canonicalize)
+
+    if "allOf" in output:
+        all_of = canonical_allof(output.pop("allOf"))
+        if all_of is False:
+            return False
+        if len(all_of) == 1 and not output:
+            return all_of[0]
+        if all_of:
+            output["allOf"] = all_of
+
+    # Weights only make sense for the branches as given
+    if "anyOf" in output and "anyOfWeights" not in output:
+        any_of = canonical_anyof(output.pop("anyOf"))
+        if any_of is not True:
+            if len(any_of) == 0:
+                return False
+            if len(any_of) == 1 and not output:
+                return any_of[0]
+            output["anyOf"] = any_of
+
+    return output
+
+
+def schema_size(schema):
+    """ Count the values in a schema and its serialized length """
+    return {
+        "nodes": count_values(schema),
+        "bytes": len(custom_json_dumps(schema)),
+    }
+
+
+def canonicalize_with_report(schema):
+    """
+    Canonicalize a schema and report its size
+    before and after
+
+    Returns the canonical schema and a report
+    of the form {"before": size, "after": size}.
+    """
+    canonical = canonicalize(schema)
+    return canonical, {
+        "before": schema_size(schema),
+        "after": schema_size(canonical),
+    }
 
 
 # pylint: disable=too-many-branches
@@ -266,11 +831,13 @@ def invert(
 
     all_of = schema.get("allOf", None)
     if all_of:
-        inverted_schemas.append({"anyOf": [invert(s) for s in all_of]})
+        inverted_schemas.append(
+            {"anyOf": [invert_subschema(s) for s in all_of]})
 
     any_of = schema.get("anyOf", None)
     if any_of:
-        inverted_schemas.append({"allOf": [invert(s) for s in any_of]})
+        inverted_schemas.append(
+            {"allOf": [invert_subschema(s) for s in any_of]})
 
     one_of = schema.get("oneOf", None)
     if one_of:
@@ -278,13 +845,26 @@ def invert(
         inverted_schemas.append({
             "anyOf": [
                 {
-                    "allOf": [invert(s) for s in one_of]
+                    "allOf": [invert_subschema(s) for s in one_of]
                 }, {
                     "allOf": one_of
                 }
             ]
         })
 
+    not_schema = schema.get("not", None)
+    if not_schema is not None:
+        inverted_schemas.append(not_schema)
+
+    # Values
+
+    enum = schema.get("enum", None)
+    if enum is not None:
+        inverted_schemas.append({"notEnum": enum})
+
+    if "const" in schema:
+        inverted_schemas.append({"notEnum": [schema["const"]]})
+
     # Strings
 
     min_length = schema.get("minLength", None)
@@ -295,6 +875,10 @@ def invert(
     if max_length:
         inverted_schemas.append({'minLength': max_length + 1})
 
+    string_format = schema.get("format", None)
+    if string_format:
+        inverted_schemas.append({"notFormat": [string_format]})
+
     pattern = schema.get("pattern", None)
     if pattern:
         # Use a tempered greedy token that will match anything not matched
@@ -326,7 +910,9 @@ def invert(
     properties = schema.get("properties", None)
     if properties:
         inverted_schemas.append({
-            "properties": {k: invert(v) for k, v in properties.items()},
+            "properties": {
+                k: invert_subschema(v) for k, v in properties.items()
+            },
             "anyOf": [{"required": [k]} for k in properties.keys()],
         })
 
@@ -339,13 +925,14 @@ def invert(
     additional_properties = schema.get("additionalProperties", None)
     if additional_properties is not None:
         inverted_schemas.append({
-            "someAdditionalProperty": invert(additional_properties),
+            "someAdditionalProperty": invert_subschema(additional_properties),
         })
 
     some_additional_property = schema.get("someAdditionalProperty", None)
     if some_additional_property is not None:
         inverted_schemas.append({
-            "additionalProperties": invert(some_additional_property),
+            "additionalProperties": invert_subschema(
+                some_additional_property),
         })
 
     # Arrays
@@ -356,16 +943,16 @@ def invert(
             item_conditions = []
             for index, item_schema in enumerate(items):
                 item_conditions.append({
-                    "items": [{}] * index + [invert(item_schema)]
+                    "items": [{}] * index + [invert_subschema(item_schema)]
                 })
             inverted_schemas.append(
                 {"anyOf": item_conditions + [{"maxItems": len(items) - 1}]})
         else:
-            inverted_schemas.append({"contains": invert(items)})
+            inverted_schemas.append({"contains": invert_subschema(items)})
 
     contains = schema.get("contains", None)
     if contains:
-        inverted_schemas.append({"items": invert(contains)})
+        inverted_schemas.append({"items": invert_subschema(contains)})
 
     unique_items = schema.get("uniqueItems", False)
     if unique_items:
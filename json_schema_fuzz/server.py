@@ -0,0 +1,195 @@
+"""
+Long-lived generator server
+
+Keeps compiled schemas in memory and serves samples
+over HTTP as newline delimited JSON (NDJSON).
+
+Endpoints:
+
+    POST /schemas
+        Body is a JSON schema. Responds with {"schema": <hash>}.
+
+    GET /samples?schema=<hash or path>&count=<N>&seed=<S>&start=<I>
+        Streams N samples, one JSON document per line. If a seed
+        is given, the samples are documents I to I + N - 1 of the
+        sequence for that seed (see sample_at). If the first sample
+        can't be generated the response is an error status instead. A
+        later failure ends the stream with a line {"error": <message>}.
+
+        Only files given at startup, or files under the schema root
+        directory, can be referred to by path.
+"""
+import itertools
+import json
+import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import RejectionSamplingFailed, generate_json, sample_at
+from .cache import SchemaCache
+from .utils import custom_json_dumps, custom_json_loads
+
+
+class SampleRequestHandler(BaseHTTPRequestHandler):
+    """ Handle requests for schema registration and samples """
+
+    def send_json(self, status, value):
+        """ Send a complete JSON response """
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """ Register a schema """
+        if urlparse(self.path).path != "/schemas":
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            schema = custom_json_loads(self.rfile.read(length))
+        except ValueError as err:
+            self.send_error(400, f"Invalid schema: {err}")
+            return
+
+        key = self.server.cache.add(schema)
+        self.send_json(200, {"schema": key})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """ Stream samples from a schema """
+        url = urlparse(self.path)
+        if url.path != "/samples":
+            self.send_error(404)
+            return
+
+        params = {
+            key: values[-1]
+            for key, values in parse_qs(url.query).items()
+        }
+
+        schema_reference = params.get("schema", None)
+        if schema_reference is None:
+            self.send_error(400, "Missing schema parameter")
+            return
+
+        try:
+            count = int(params.get("count", 1))
+            start = int(params.get("start", 0))
+            seed = params.get("seed", None)
+            if seed is not None:
+                seed = int(seed)
+        except ValueError:
+            self.send_error(400, "count, start and seed must be integers")
+            return
+
+        schema = self.server.resolve_schema(schema_reference)
+        if schema is None:
+            self.send_error(404, f"Unknown schema {schema_reference}")
+            return
+
+        samples = generate_samples(schema, seed, start, count)
+        # Generate the first sample before sending headers
+        # so that a failure can still get an error status
+        try:
+            first = list(itertools.islice(samples, 1))
+        except RejectionSamplingFailed as err:
+            self.send_error(422, f"Failed to generate sample: {err}")
+            return
+        except Exception as err:  # pylint: disable=broad-except
+            self.send_error(500, f"Failed to generate sample: {err}")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        try:
+            for sample in itertools.chain(first, samples):
+                self.write_line(sample)
+        except Exception as err:  # pylint: disable=broad-except
+            # The status has already been sent, so
+            # end the stream with an error line instead
+            self.write_line({"error": f"Failed to generate sample: {err}"})
+
+    def write_line(self, value):
+        """ Write a value as one line of NDJSON """
+        self.wfile.write(custom_json_dumps(value).encode("utf-8"))
+        self.wfile.write(b"\n")
+
+
+def generate_samples(schema, seed, start, count):
+    """
+    Yield samples start to start + count - 1
+
+    Without a seed the samples are drawn from the global random state.
+    """
+    for index in range(start, start + count):
+        if seed is not None:
+            yield sample_at(schema, seed, index)
+        else:
+            yield generate_json(schema)
+
+
+class GeneratorServer(HTTPServer):
+    """
+    HTTP server holding a cache of compiled schemas
+
+    Requests are handled one at a time so that seeded
+    requests are reproducible.
+    """
+
+    def __init__(self, server_address, cache=None,
+                 schema_files=(), schema_root=None):
+        super().__init__(server_address, SampleRequestHandler)
+        self.cache = cache if cache is not None else SchemaCache()
+        self.schema_files = {os.path.realpath(path) for path in schema_files}
+        self.schema_root = (
+            os.path.realpath(schema_root) if schema_root is not None
+            else None
+        )
+        for path in schema_files:
+            self.cache.add_file(path)
+
+    def allows_file(self, path):
+        """
+        Check whether a schema file may be served
+
+        Clients may only refer to files given at startup or
+        files inside the schema root directory.
+        """
+        path = os.path.realpath(path)
+        if path in self.schema_files:
+            return True
+        if self.schema_root is None:
+            return False
+        return os.path.commonpath([path, self.schema_root]) == \
+            self.schema_root
+
+    def resolve_schema(self, reference):
+        """
+        Find a compiled schema by hash or file path
+
+        Returns None if the schema can't be found
+        or the file isn't allowed.
+        """
+        if reference in self.cache:
+            return self.cache.get(reference)
+        if not self.allows_file(reference):
+            return None
+        try:
+            return self.cache.get(self.cache.add_file(reference))
+        except (OSError, ValueError):
+            return None
+
+
+def serve(host="127.0.0.1", port=8000, schema_files=(), schema_root=None):
+    """ Run the generator server until interrupted """
+    server = GeneratorServer(
+        (host, port), schema_files=schema_files, schema_root=schema_root)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
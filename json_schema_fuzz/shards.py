@@ -0,0 +1,126 @@
+"""
+Sharded corpus output
+
+Writes samples to gzip-compressed NDJSON shard files in parallel
+worker processes, along with a manifest describing each shard.
+Document i of the corpus is generated from (seed, i) as in
+sample_at, so a shard can be regenerated on its own.
+"""
+import functools
+import gzip
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from . import compile_schema, generate_json
+from .utils import custom_json_dumps, derive_seed
+
+CHUNK_SIZE = 1 << 16
+
+
+def file_sha256(path):
+    """ Get the SHA-256 digest of a file """
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(functools.partial(stream.read, CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def shard_path(prefix, index):
+    """ Get the path of a shard file """
+    return f"{prefix}-{index:05d}.ndjson.gz"
+
+
+def write_shard(sample, seed, start, stop, path):
+    """
+    Write documents start to stop (exclusive) of the sequence
+    for seed to a gzip-compressed NDJSON file
+
+    sample is called with the random state seeded for each
+    document. Returns the manifest entry for the shard.
+    """
+    with open(path, "wb") as raw:
+        # Leave out the timestamp so output is reproducible
+        with gzip.GzipFile(
+                filename="", mode="wb", fileobj=raw, mtime=0) as stream:
+            for index in range(start, stop):
+                random.seed(derive_seed(seed, index))
+                stream.write(custom_json_dumps(sample()).encode("utf-8"))
+                stream.write(b"\n")
+
+    return {
+        "path": os.path.basename(path),
+        "documents": stop - start,
+        "bytes": os.path.getsize(path),
+        "seed": seed,
+        "start_index": start,
+        "stop_index": stop,
+        "sha256": file_sha256(path),
+    }
+
+
+# pylint: disable=too-many-arguments
+def write_shards(
+        sample,
+        prefix,
+        count,
+        *,
+        shards=1,
+        processes=None,
+        seed=None,
+        start_index=0,
+):
+    """
+    Write count documents split over shards files named
+    {prefix}-{shard}.ndjson.gz and a manifest named
+    {prefix}-manifest.json
+
+    sample is a picklable callable returning one document,
+    such as functools.partial(generate_json, compiled_schema).
+    Shards are written by `processes` worker processes (one
+    per shard, up to the number of CPUs, if not given). If
+    seed is not given a random one is chosen and recorded in
+    the manifest.
+
+    Returns the manifest.
+    """
+    if shards < 1:
+        raise ValueError("shards must be at least 1")
+    if processes is None:
+        processes = min(shards, os.cpu_count() or 1)
+    elif processes < 1:
+        raise ValueError("processes must be at least 1")
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    # Split the index range as evenly as possible
+    bounds = [
+        start_index + count * shard // shards
+        for shard in range(shards + 1)
+    ]
+    arguments = [
+        (sample, seed, bounds[shard], bounds[shard + 1],
+         shard_path(prefix, shard))
+        for shard in range(shards)
+    ]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        entries = list(executor.map(write_shard, *zip(*arguments)))
+
+    manifest = {
+        "seed": seed,
+        "documents": count,
+        "shards": entries,
+    }
+    with open(f"{prefix}-manifest.json", "w", encoding="utf-8") as stream:
+        json.dump(manifest, stream, indent=2)
+    return manifest
+
+
+def write_schema_shards(schema, prefix, count, **kwargs):
+    """ Write shards of documents generated from schema """
+    sample = functools.partial(generate_json, compile_schema(schema))
+    return write_shards(sample, prefix, count, **kwargs)
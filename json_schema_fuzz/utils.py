@@ -1,4 +1,5 @@
 """ Utility functions and constants for fuzzer module """
+import hashlib
 import json
 import math
 import random
@@ -8,6 +9,18 @@ from typing import List
 ALL_TYPES = ["object", "number", "array",
              "string", "null", "boolean", "integer"]
 
+# Keywords holding a subschema or a list of subschemas
+SUBSCHEMA_KEYWORDS = {
+    "not", "items", "additionalItems", "contains",
+    "additionalProperties", "someAdditionalProperty",
+}
+
+# Keywords holding a mapping of subschemas
+SUBSCHEMA_MAPPING_KEYWORDS = {"properties", "patternProperties"}
+
+# Keywords holding a list of subschemas to combine
+COMBINATION_KEYWORDS = {"allOf", "anyOf", "oneOf"}
+
 
 def custom_json_loads(input_string):
     """ Load JSON using Python's decimal type for numbers """
@@ -18,6 +31,140 @@ def custom_json_loads(input_string):
     )
 
 
+class DecimalEncoder(json.JSONEncoder):
+    """ JSON encoder that writes Decimal values as JSON numbers """
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            if o == o.to_integral_value():
+                return int(o)
+            return float(o)
+        return super().default(o)
+
+
+def custom_json_dumps(value, **kwargs):
+    """ Dump JSON, writing Python's decimal type as numbers """
+    return json.dumps(value, cls=DecimalEncoder, **kwargs)
+
+
+def canonical_json(value):
+    """
+    Dump JSON so that equal values (including key
+    order differences) give the same string
+    """
+    return custom_json_dumps(
+        value,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def schema_hash(schema):
+    """
+    Hash a schema by its structure.
+
+    Schemas that are equal (including key order differences)
+    produce the same hash.
+    """
+    canonical = canonical_json(schema)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def map_subschemas(schema, function):
+    """
+    Copy a schema node with function applied to each of its
+    subschemas, under any keyword, but not to their subschemas
+    """
+    output = dict(schema)
+    for key, value in schema.items():
+        if key in SUBSCHEMA_MAPPING_KEYWORDS:
+            output[key] = {
+                name: function(subschema) for name, subschema in value.items()
+            }
+        elif key in COMBINATION_KEYWORDS or (
+                key in SUBSCHEMA_KEYWORDS and isinstance(value, list)):
+            output[key] = [function(subschema) for subschema in value]
+        elif key in SUBSCHEMA_KEYWORDS:
+            output[key] = function(value)
+    return output
+
+
+def all_subschemas(schema):
+    """ Get the subschemas of a schema node under any keyword """
+    children = []
+    map_subschemas(schema, children.append)
+    return children
+
+
+def structural_hashes(schema, max_depth=None):
+    """
+    Hash a schema and each of its subschemas by structure.
+
+    Each node is hashed with its subschemas replaced by their
+    hashes, Merkle style, so every part of the schema is only
+    serialized once and deeply nested schemas don't hit the
+    recursion limit. Equal subschemas get the same hash wherever
+    they appear. Returns a dict mapping the id of each node
+    to its hash.
+
+    If max_depth is given, subschemas nested deeper than that
+    are hashed by identity instead, which bounds the cost for
+    deep schemas but tells some equal subschemas apart.
+    """
+    hashes = {}
+
+    def reference(value):
+        if isinstance(value, dict):
+            return hashes[id(value)]
+        return value
+
+    stack = [(schema, False, 0)]
+    while stack:
+        node, children_done, depth = stack.pop()
+        if not isinstance(node, dict) or id(node) in hashes:
+            continue
+        if max_depth is not None and depth > max_depth:
+            hashes[id(node)] = f"id:{id(node)}"
+            continue
+        if not children_done:
+            # Hash subschemas first
+            stack.append((node, True, depth))
+            stack.extend(
+                (child, False, depth + 1) for child in all_subschemas(node))
+            continue
+
+        hashes[id(node)] = schema_hash(map_subschemas(node, reference))
+    return hashes
+
+
+def derive_seed(seed, index):
+    """
+    Derive the seed for one document of a sequence.
+
+    The result depends only on (seed, index) so any document
+    can be reproduced without generating the ones before it.
+    """
+    digest = hashlib.blake2b(
+        f"{seed}:{index}".encode("utf-8"),
+        digest_size=8,
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def count_values(value):
+    """ Count the JSON values in a value, including itself """
+    stack = [value]
+    count = 0
+    while stack:
+        value = stack.pop()
+        count += 1
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
+
+
 def listify(value):
     """ If value is not a list wrap it in a list """
     if isinstance(value, list):
@@ -52,9 +199,10 @@ def lcm(
     return current_product // current_gcd
 
 
-def random_multiple_in_range(start, stop, multiple):
+def multiples_in_range(start, stop, multiple):
     """
-    Sample a random multiple of a number within a specified range (inclusive)
+    Find the first multiple of a number within a specified
+    range (inclusive) and how many more multiples follow it
 
     Supports decimal values
     """
@@ -63,6 +211,17 @@ def random_multiple_in_range(start, stop, multiple):
     last_multiple = math.floor(stop / multiple) * multiple
 
     num_multiples = int((last_multiple - first_multiple) / multiple)
+    return first_multiple, num_multiples
+
+
+def random_multiple_in_range(start, stop, multiple):
+    """
+    Sample a random multiple of a number within a specified range (inclusive)
+
+    Supports decimal values
+    """
+
+    first_multiple, num_multiples = multiples_in_range(start, stop, multiple)
 
     instance_multiple = random.randint(0, num_multiples)
 
@@ -0,0 +1,93 @@
+"""
+Weighted mixes of schemas
+
+A workload interleaves samples from several schemas in a single
+stream. Each schema is compiled once into a shared cache.
+
+A workload manifest is a JSON file of the form:
+
+    {
+        "schemas": [
+            {"path": "node.json", "weight": 3},
+            {"path": "edge.json", "weight": 1, "name": "edge"}
+        ]
+    }
+
+Paths are relative to the manifest. A directory can be used
+in place of a manifest, giving every schema in it a weight of 1.
+"""
+import os
+import random
+
+from . import generate_json
+from .cache import SchemaCache
+from .utils import custom_json_loads
+
+
+class Workload:
+    """ Weighted set of compiled schemas """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else SchemaCache()
+        self.names = []
+        self.schemas = []
+        self.cumulative_weights = []
+
+    def add(self, schema, weight=1, name=None):
+        """ Add a schema to the workload with the given weight """
+        if weight <= 0:
+            raise ValueError(f"Weight must be positive, got {weight}")
+        key = self.cache.add(schema)
+        self._append(key, weight, name)
+
+    def add_file(self, path, weight=1, name=None):
+        """ Add the schema stored at path with the given weight """
+        if weight <= 0:
+            raise ValueError(f"Weight must be positive, got {weight}")
+        key = self.cache.add_file(path)
+        self._append(key, weight, name or os.path.basename(path))
+
+    def _append(self, key, weight, name):
+        total = self.cumulative_weights[-1] if self.cumulative_weights else 0
+        self.names.append(name or key)
+        self.schemas.append(self.cache.get(key))
+        self.cumulative_weights.append(total + float(weight))
+
+    def sample_with_name(self):
+        """ Choose a schema by weight and return (name, sample) """
+        index = random.choices(
+            range(len(self.schemas)),
+            cum_weights=self.cumulative_weights,
+        )[0]
+        return self.names[index], generate_json(self.schemas[index])
+
+    def sample(self):
+        """ Choose a schema by weight and generate a sample from it """
+        return self.sample_with_name()[1]
+
+    def __len__(self):
+        return len(self.schemas)
+
+
+def load_workload(path, cache=None):
+    """ Load a workload from a manifest file or a directory of schemas """
+    workload = Workload(cache)
+
+    if os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith(".json"):
+                workload.add_file(os.path.join(path, filename))
+    else:
+        with open(path, "r") as stream:
+            manifest = custom_json_loads(stream.read())
+        base_dir = os.path.dirname(os.path.abspath(path))
+        for entry in manifest["schemas"]:
+            workload.add_file(
+                os.path.join(base_dir, entry["path"]),
+                weight=entry.get("weight", 1),
+                name=entry.get("name", None),
+            )
+
+    if len(workload) == 0:
+        raise ValueError(f"No schemas found in {path}")
+    return workload
@@ -0,0 +1,113 @@
+""" Test caching and incremental compilation of schemas """
+import copy
+import json
+import os
+
+from json_schema_fuzz import compile_schema
+from json_schema_fuzz.cache import SchemaCache, SchemaWatcher
+from json_schema_fuzz.utils import structural_hashes
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "a": {
+            "allOf": [
+                {"type": "integer", "minimum": 0},
+                {"maximum": 10},
+            ]
+        },
+        "b": {
+            "type": "array",
+            "items": {"oneOf": [{"type": "string"}, {"type": "null"}]},
+        },
+        "c": {"type": "boolean"},
+    },
+}
+
+
+def test_structural_hashes():
+    """ Test that equal subschemas get equal hashes """
+    schema = {
+        "properties": {
+            "a": {"type": "string", "minLength": 1},
+            "b": {"minLength": 1, "type": "string"},
+            "c": {"type": "string", "minLength": 2},
+        }
+    }
+    hashes = structural_hashes(schema)
+    properties = schema["properties"]
+    assert hashes[id(properties["a"])] == hashes[id(properties["b"])]
+    assert hashes[id(properties["a"])] != hashes[id(properties["c"])]
+    other = copy.deepcopy(schema)
+    assert hashes[id(schema)] == structural_hashes(other)[id(other)]
+
+    # Lists are ordered
+    first = {"enum": [1, 2]}
+    second = {"enum": [2, 1]}
+    assert structural_hashes(first)[id(first)] != \
+        structural_hashes(second)[id(second)]
+
+
+def test_compile_with_cache():
+    """ Test that a cache gives the same result as compiling normally """
+    cache = {}
+    assert compile_schema(SCHEMA, cache) == compile_schema(SCHEMA)
+    assert len(cache) > 0
+
+    # Compiling again reuses the whole schema
+    size = len(cache)
+    compiled = compile_schema(SCHEMA, cache)
+    assert compiled is compile_schema(SCHEMA, cache)
+    assert len(cache) == size
+
+
+def test_compile_changed_schema():
+    """ Test that only changed subschemas are compiled again """
+    cache = {}
+    compiled = compile_schema(SCHEMA, cache)
+
+    edited = copy.deepcopy(SCHEMA)
+    edited["properties"]["c"] = {"type": "null"}
+    size = len(cache)
+    recompiled = compile_schema(edited, cache)
+
+    assert recompiled == compile_schema(edited)
+    # The root and the changed property
+    assert len(cache) == size + 2
+    for name in ("a", "b"):
+        assert recompiled["properties"][name] is \
+            compiled["properties"][name]
+
+
+def test_schema_cache_shares_subschemas():
+    """ Test that the schema cache reuses subschemas between schemas """
+    cache = SchemaCache()
+    edited = copy.deepcopy(SCHEMA)
+    edited["properties"]["c"] = {"type": "null"}
+
+    first = cache.get(cache.add(SCHEMA))
+    second = cache.get(cache.add(edited))
+    assert first["properties"]["a"] is second["properties"]["a"]
+    assert second == compile_schema(edited)
+
+
+def test_schema_watcher(tmp_path):
+    """ Test that the watcher recompiles a schema when its file changes """
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(SCHEMA))
+
+    watcher = SchemaWatcher(str(path))
+    compiled = watcher.poll()
+    assert compiled == compile_schema(SCHEMA)
+    assert watcher.poll() is None
+
+    edited = copy.deepcopy(SCHEMA)
+    edited["properties"]["c"] = {"type": "null"}
+    path.write_text(json.dumps(edited))
+    # Make sure the modification time changes
+    os.utime(str(path), (0, 1))
+
+    recompiled = watcher.poll()
+    assert recompiled["properties"]["c"] == {"type": "null"}
+    assert recompiled["properties"]["a"] is compiled["properties"]["a"]
+    assert watcher.recompiled == 2
@@ -0,0 +1,85 @@
+"""Test schema to Python code generation."""
+import glob
+import random
+from pathlib import Path
+
+import pytest
+
+from json_schema_fuzz import compile_schema, generate_json
+from json_schema_fuzz.codegen import (compile_generator, generate_source,
+                                      write_generator)
+from json_schema_fuzz.utils import custom_json_loads
+
+THIS_DIR = Path(__file__).parent
+GENERATE_CASE_DIR = THIS_DIR / "generate_cases"
+generate_case_files = glob.glob(
+    str(GENERATE_CASE_DIR / "**/*.json"), recursive=True)
+generate_cases = []
+for filename in generate_case_files:
+    with open(filename, "r") as stream:
+        generate_cases.append(custom_json_loads(stream.read()))
+
+NESTED_SCHEMA = {
+    "type": "object",
+    "required": ["id", "children"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 1, "multipleOf": 3},
+        "label": {"type": ["string", "null"], "maxLength": 4},
+        "children": {
+            "type": "array",
+            "maxItems": 3,
+            "items": {
+                "anyOf": [
+                    {"type": "boolean"},
+                    {"type": "number", "multipleOf": 0.5, "maximum": 2},
+                ],
+                "anyOfWeights": [1, 3],
+            },
+        },
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "schema",
+    generate_cases + [NESTED_SCHEMA],
+    ids=generate_case_files + ["nested"],
+)
+def test_equivalent_to_interpreter(schema):
+    """
+    Test that the generated function matches
+    generate_json under a fixed seed
+    """
+    compiled = compile_schema(schema)
+    generator = compile_generator(schema)
+    for seed in range(20):
+        random.seed(seed)
+        expected = generate_json(compiled)
+        random.seed(seed)
+        assert generator() == expected
+
+
+def test_source_inlines_schema():
+    """ Test that the source has no schema lookups """
+    source = generate_source({"type": "integer", "minimum": 5})
+    assert ".get(" not in source
+    assert "random.randint(5, 105)" in source
+
+
+def test_write_generator(tmp_path):
+    """ Test writing an importable module """
+    path = tmp_path / "generated.py"
+    write_generator({"type": "string", "maxLength": 3}, str(path),
+                    function_name="generate_name")
+
+    namespace = {}
+    exec(path.read_text(), namespace)  # pylint: disable=exec-used
+    value = namespace["generate_name"]()
+    assert isinstance(value, str)
+    assert len(value) <= 3
+
+
+def test_unsupported_schema():
+    """ Test that schemas the generator can't handle raise an error """
+    with pytest.raises(NotImplementedError):
+        generate_source({"type": "array", "items": [{"type": "integer"}]})
@@ -0,0 +1,136 @@
+""" Test schema cost analysis """
+import json
+
+from click.testing import CliRunner
+
+from json_schema_fuzz import compile_schema, generate_json
+from json_schema_fuzz.cli import cli
+from json_schema_fuzz.explain import estimate_branches, explain_schema
+from json_schema_fuzz.utils import custom_json_dumps
+
+SCHEMA = {
+    "type": "object",
+    "required": ["id", "tags"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 0, "maximum": 99999},
+        "name": {"type": "string", "maxLength": 20},
+        "tags": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": 4,
+            "items": {"type": ["string", "null"], "maxLength": 5},
+        },
+    },
+}
+
+
+def test_estimate_branches():
+    """ Test branch estimates for combinations """
+    assert estimate_branches({"type": "string"}) == 1
+    assert estimate_branches({
+        "anyOf": [{"type": "string"}, {"type": "null"}],
+    }) == 2
+    assert estimate_branches({
+        "allOf": [
+            {"anyOf": [{"minimum": 1}, {"maximum": 5}]},
+            {"anyOf": [{"type": "string"}, {"type": "null"}, {}]},
+        ],
+    }) == 6
+    # Each option is merged with the inverse of the other one,
+    # which is an anyOf of one branch per keyword
+    assert estimate_branches({
+        "oneOf": [
+            {"type": "integer", "minimum": 1},
+            {"type": "integer"},
+        ],
+    }) == 1 * 1 + 1 * 2
+
+
+def test_expected_size():
+    """ Test that the expected size is close to generated documents """
+    report = explain_schema(SCHEMA)
+
+    compiled = compile_schema(SCHEMA)
+    num_samples = 2000
+    documents = [generate_json(compiled) for _ in range(num_samples)]
+    size = sum(
+        len(custom_json_dumps(document)) for document in documents
+    ) / num_samples
+
+    assert abs(report["bytes"]["expected"] - size) < 0.1 * size
+    assert all(
+        len(custom_json_dumps(document)) <= report["bytes"]["worst"]
+        for document in documents
+    )
+    # Object, id, name half the time and 2.5 tags
+    assert report["nodes"]["expected"] == 1 + 1 + 0.5 + 1 + 2.5
+    assert report["nodes"]["worst"] == 1 + 1 + 1 + 1 + 4
+
+
+def test_tuple_items():
+    """ Test estimating arrays with a subschema per item """
+    report = explain_schema({
+        "type": "array",
+        "items": [{"type": "integer"}, {"type": "null"}],
+        "additionalItems": {"type": "boolean"},
+        "minItems": 1,
+        "maxItems": 4,
+    })
+    # Lengths 1 to 4: the second item 3/4 of the time
+    # and (1 + 2) / 4 additional items
+    assert report["nodes"]["expected"] == 1 + 1 + 0.75 + 0.75
+    assert report["nodes"]["worst"] == 5
+    assert report["slow"] == [{
+        "path": "#",
+        "reason": "items given as a list can't be generated",
+    }]
+
+
+def test_unbounded_size():
+    """ Test that nesting without limits has no worst case """
+    report = explain_schema({})
+    assert report["nodes"]["worst"] is None
+    assert report["nodes"]["expected"] == 3.5
+
+
+def test_slow_subschemas():
+    """ Test that rejection sampling is reported """
+    report = explain_schema({
+        "type": "object",
+        "properties": {
+            "code": {"type": "string", "pattern": "[A-Z]+", "maxLength": 4},
+            "odd": {"type": "integer", "notMultipleOf": 2},
+            "never": {
+                "type": "integer",
+                "multipleOf": 4,
+                "notMultipleOf": 2,
+            },
+            "fine": {"type": "integer"},
+            "email": {"type": "string", "format": "email", "maxLength": 10},
+            "uuid": {"type": "string", "format": "uuid"},
+        },
+    })
+    assert {
+        entry["path"]: entry["reason"] for entry in report["slow"]
+    } == {
+        "#/properties/code":
+            "pattern with length bounds uses rejection sampling",
+        "#/properties/odd":
+            "notMultipleOf rejection sampling takes 2.0 tries per integer",
+        "#/properties/never": "notMultipleOf rejects every integer",
+        "#/properties/email":
+            "format email with length bounds uses rejection sampling",
+    }
+
+
+def test_explain_command(tmp_path):
+    """ Test the explain command """
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(SCHEMA))
+
+    result = CliRunner().invoke(cli, ["explain", str(path)])
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output)
+    assert report["nodes"]["worst"] == 8
+    assert report["slow"] == []
+    assert report["size"]["before"] == report["size"]["after"]
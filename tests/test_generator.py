@@ -1,13 +1,22 @@
 """Test JSON schema fuzzer."""
+import copy
+import datetime
 import glob
+import ipaddress
+import random
 import re
+import uuid
 from pathlib import Path
 
 import jsonpickle
 import jsonschema
 import pytest
 
-from json_schema_fuzz import generate_json, simplify_schema
+from json_schema_fuzz import (MAX_ADDITIONAL_PROPERTIES,
+                              RejectionSamplingFailed, compile_schema,
+                              generate_json, sample_at, sample_range,
+                              simplify_schema)
+from json_schema_fuzz.formats import FORMAT_CHECKERS
 from json_schema_fuzz.utils import custom_json_loads
 
 # Create a custom validator
@@ -53,7 +62,8 @@ def test_generate_validate(schema):
     jsonschema library.
     """
     num_generated_values = 100
-    validator = ExtendedValidator(schema)
+    validator = ExtendedValidator(
+        schema, format_checker=jsonschema.FormatChecker())
 
     for _ in range(num_generated_values):
         value = generate_json(schema)
@@ -136,3 +146,253 @@ def test_simplify():
     assert "oneOf" not in schema
     assert "allOf" not in schema
     assert "anyOf" in schema
+
+
+def test_sample_at():
+    """
+    Test that indexed samples are reproducible and
+    independent of the order they are generated in
+    """
+    schema = compile_schema({
+        "type": "array",
+        "items": {"type": "integer"},
+    })
+
+    forward = list(sample_range(schema, 42, 0, 10))
+    backward = [sample_at(schema, 42, index) for index in reversed(range(10))]
+    assert forward == backward[::-1]
+
+    assert sample_at(schema, 42, 3) == forward[3]
+    assert list(sample_range(schema, 43, 0, 10)) != forward
+
+
+def test_compile_anyof():
+    """
+    Test that compiling pre-merges each anyOf branch
+    with the rest of the schema
+    """
+    schema = {
+        "type": "integer",
+        "minimum": 0,
+        "anyOf": [
+            {"maximum": 5},
+            {"anyOf": [{"minimum": 10}, {"multipleOf": 7}]},
+        ],
+    }
+    original = copy.deepcopy(schema)
+    compiled = compile_schema(schema)
+
+    assert schema == original
+    assert set(compiled) == {"anyOf", "anyOfWeights"}
+    assert compiled["anyOf"] == [
+        {"type": ["integer"], "minimum": 0, "maximum": 5},
+        {"type": ["integer"], "minimum": 10},
+        {"type": ["integer"], "minimum": 0, "multipleOf": 7},
+    ]
+    # Nested branches share the weight of their parent branch
+    assert compiled["anyOfWeights"] == [1.0, 0.5, 0.5]
+
+
+def test_compile_drops_invalid_branches():
+    """ Test that branches that can never be valid are removed """
+    compiled = compile_schema({
+        "anyOf": [{"allOf": [False]}, {"type": "null"}],
+    })
+    assert compiled == {"anyOf": [{"type": "null"}]}
+    assert generate_json(compiled) is None
+
+
+def test_compile_combines_equal_branches():
+    """ Test that equal compiled branches are combined with their weights """
+    compiled = compile_schema({
+        "type": "integer",
+        "anyOf": [{"minimum": 0}, {"maximum": 9}, {"minimum": 0}],
+        "anyOfWeights": [1, 2, 3],
+    })
+    assert compiled == {
+        "anyOf": [
+            {"type": ["integer"], "minimum": 0},
+            {"type": ["integer"], "maximum": 9},
+        ],
+        "anyOfWeights": [4.0, 2.0],
+    }
+
+
+def test_anyof_weights_with_allof():
+    """ Test that weights survive merging allOf into the schema """
+    compiled = compile_schema({
+        "anyOf": [{"type": "integer"}, {"type": "string"}],
+        "anyOfWeights": [9, 1],
+        "allOf": [{"minimum": 0}],
+    })
+    assert compiled == {
+        "anyOf": [
+            {"type": ["integer"], "minimum": 0},
+            {"type": ["string"], "minimum": 0},
+        ],
+        "anyOfWeights": [9.0, 1.0],
+    }
+
+
+def test_anyof_weights():
+    """ Test that anyOfWeights biases the choice of branch """
+    random.seed(0)
+    schema = compile_schema({
+        "anyOf": [{"type": "null"}, {"type": "boolean"}],
+        "anyOfWeights": [9, 1],
+    })
+    samples = [generate_json(schema) for _ in range(1000)]
+    assert samples.count(None) > 800
+
+    with pytest.raises(ValueError):
+        compile_schema({"anyOf": [{}, {}], "anyOfWeights": [1]})
+
+
+def test_pattern_properties():
+    """ Test generating map-like objects from patternProperties """
+    random.seed(0)
+    schema = compile_schema({
+        "type": "object",
+        "properties": {"id_0000": {"maximum": 5}},
+        "patternProperties": {
+            "^id_[0-9]{4}$": {"type": "integer", "minimum": 1},
+        },
+        "additionalProperties": {"type": "boolean"},
+        "minProperties": 2000,
+        "maxProperties": 2000,
+    })
+    output = generate_json(schema)
+    assert len(output) == 2000
+    for key, value in output.items():
+        if key == "id_0000":
+            # Declared properties also satisfy matching patterns
+            assert isinstance(value, int) and 1 <= value <= 5
+        elif re.search("^id_[0-9]{4}$", key):
+            assert isinstance(value, int) and value >= 1
+        else:
+            # Additional keys never match a pattern
+            assert isinstance(value, bool)
+
+
+def test_min_properties_unreachable():
+    """ Test that too few allowed keys for minProperties is an error """
+    schema = compile_schema({
+        "type": "object",
+        "properties": {"a": {"type": "null"}},
+        "additionalProperties": False,
+        "minProperties": 2,
+    })
+    with pytest.raises(RejectionSamplingFailed):
+        generate_json(schema)
+
+
+def test_pattern_properties_few_keys():
+    """ Test patterns that allow fewer keys than the default count """
+    random.seed(0)
+    schema = compile_schema({
+        "type": "object",
+        "patternProperties": {"^(foo|bar)$": {"type": "null"}},
+        "additionalProperties": False,
+    })
+    keys = set()
+    for _ in range(50):
+        output = generate_json(schema)
+        assert set(output) <= {"foo", "bar"}
+        keys.update(output)
+    assert keys == {"foo", "bar"}
+
+    # Random keys make up minProperties unless they are forbidden
+    schema = compile_schema({
+        "type": "object",
+        "patternProperties": {"^a$": {"type": "null"}},
+        "minProperties": 3,
+    })
+    assert all(len(generate_json(schema)) >= 3 for _ in range(50))
+
+
+def test_additional_properties_size():
+    """ Test the default number of additional properties """
+    random.seed(0)
+    schema = compile_schema({
+        "type": "object",
+        "additionalProperties": {"type": "null"},
+    })
+    sizes = {len(generate_json(schema)) for _ in range(200)}
+    assert sizes == set(range(MAX_ADDITIONAL_PROPERTIES + 1))
+
+    # No extra keys unless additionalProperties is a subschema
+    assert generate_json({"type": "object"}) == {}
+
+
+def test_enum():
+    """ Test that enum values are filtered when compiling """
+    schema = compile_schema({
+        "type": "integer",
+        "enum": [1, 2, 3, 4, 5, "a"],
+        "minimum": 2,
+        "notMultipleOf": 3,
+    })
+    assert schema == {"enum": [2, 4, 5]}
+    assert compile_schema({"enum": [1, 2], "const": 3}) is False
+
+    random.seed(0)
+    assert {generate_json(schema) for _ in range(100)} == {2, 4, 5}
+
+    # Mutable values are copied
+    schema = compile_schema({"const": {"a": [1]}})
+    value = generate_json(schema)
+    value["a"].append(2)
+    assert generate_json(schema) == {"a": [1]}
+
+
+def test_formats():
+    """ Test that format samplers build valid strings """
+    random.seed(0)
+    for _ in range(100):
+        value = generate_json({"type": "string", "format": "date-time"})
+        datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+        value = generate_json({"type": "string", "format": "uuid"})
+        assert uuid.UUID(value).version == 4
+        value = generate_json({"type": "string", "format": "ipv4"})
+        ipaddress.IPv4Address(value)
+        value = generate_json({"type": "string", "format": "ipv6"})
+        ipaddress.IPv6Address(value)
+        value = generate_json({"type": "string", "format": "email"})
+        assert re.fullmatch(r"[a-z0-9]+@([a-z0-9]+\.)+[a-z]+", value)
+
+    # Length bounds still apply
+    values = {
+        generate_json({"type": "string", "format": "uri", "maxLength": 20})
+        for _ in range(100)
+    }
+    assert all(len(value) <= 20 for value in values)
+
+    # Formats that can't fit the length bounds rule out strings
+    assert compile_schema(
+        {"type": "string", "format": "uuid", "maxLength": 5}) is False
+    for _ in range(100):
+        value = generate_json({"format": "uuid", "maxLength": 5})
+        assert not isinstance(value, str)
+
+
+def test_not_format():
+    """ Test that strings in a format excluded by not are rejected """
+    random.seed(0)
+    schema = compile_schema({
+        "type": "string",
+        "maxLength": 40,
+        "not": {"format": "date"},
+    })
+    values = {generate_json(schema) for _ in range(100)}
+    assert len(values) > 1
+    assert not any(FORMAT_CHECKERS["date"](value) for value in values)
+
+    # Each oneOf branch rules out the other branch's format
+    schema = compile_schema({
+        "type": "string",
+        "oneOf": [{"format": "email"}, {"format": "uuid"}],
+    })
+    for _ in range(100):
+        value = generate_json(schema)
+        assert FORMAT_CHECKERS["email"](value) != \
+            FORMAT_CHECKERS["uuid"](value)
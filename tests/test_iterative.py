@@ -0,0 +1,99 @@
+"""Test iterative JSON generation."""
+import random
+
+import pytest
+
+from json_schema_fuzz import compile_schema, generate_json
+from json_schema_fuzz.iterative import generate_json_iterative
+
+SCHEMAS = [
+    {"type": "integer", "multipleOf": 3},
+    {"anyOf": [{"type": "string"}, {"type": "number", "maximum": 0}]},
+    {
+        "type": "object",
+        "required": ["a"],
+        "properties": {
+            "a": {"type": "array", "items": {"type": "boolean"}},
+            "b": {
+                "type": "object",
+                "properties": {
+                    "c": {"type": ["null", "string"]},
+                    "d": {"oneOf": [{"type": "integer"}, {"minimum": 3}]},
+                },
+            },
+            "e": {"type": "array", "minItems": 1, "maxItems": 3},
+        },
+    },
+]
+
+
+@pytest.mark.parametrize("schema", SCHEMAS)
+def test_same_as_recursive(schema):
+    """ Test that output matches generate_json for the same seed """
+    schema = compile_schema(schema)
+    for seed in range(20):
+        random.seed(seed)
+        expected = generate_json(schema)
+        random.seed(seed)
+        assert generate_json_iterative(schema) == expected
+
+
+def nested_schema(depth):
+    """ Schema for objects nested depth levels deep around a null """
+    schema = {"type": "null"}
+    for _ in range(depth):
+        schema = {
+            "type": "object",
+            "properties": {"child": schema},
+            "required": ["child"],
+        }
+    return schema
+
+
+def test_deep_nesting():
+    """ Test generating past the recursion limit """
+    depth = 5000
+    value = generate_json_iterative(compile_schema(nested_schema(depth)))
+    for _ in range(depth):
+        value = value["child"]
+    assert value is None
+
+
+@pytest.mark.parametrize("keyword,other", [
+    ("allOf", {"type": "object"}),
+    ("oneOf", {"type": "integer"}),
+])
+def test_deep_combination(keyword, other):
+    """ Test compiling a combination with a deeply nested schema """
+    depth = 3000
+    # Compiled on first use, without recursion
+    schema = {keyword: [nested_schema(depth), other]}
+
+    random.seed(0)
+    for _ in range(5):
+        value = generate_json_iterative(schema)
+        if isinstance(value, int):
+            continue
+        for _ in range(depth):
+            assert list(value) == ["child"]
+            value = value["child"]
+        assert value is None
+
+
+@pytest.mark.parametrize("inverted", [False, True])
+def test_deep_anyof_chain(inverted):
+    """ Test compiling anyOfs nested in each other past the recursion limit """
+    schema = {"type": "null"}
+    for _ in range(2000):
+        schema = {"anyOf": [schema, {"type": "string"}]}
+    if inverted:
+        schema = {"not": schema}
+    schema = compile_schema(schema)
+
+    random.seed(0)
+    for _ in range(20):
+        value = generate_json_iterative(schema)
+        if inverted:
+            assert value is not None and not isinstance(value, str)
+        else:
+            assert value is None or isinstance(value, str)
@@ -0,0 +1,120 @@
+"""Test HTTP load generation."""
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from json_schema_fuzz.load import percentile, run_load
+
+
+class StandInServer(socketserver.ThreadingMixIn, HTTPServer):
+    """ Local HTTP server that records what it receives """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.lock = threading.Lock()
+        self.documents = []
+        self.paths = []
+        self.clients = set()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Accept JSON documents over keep-alive connections """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """ Record the posted document """
+        length = int(self.headers["Content-Length"])
+        document = json.loads(self.rfile.read(length))
+        with self.server.lock:
+            self.server.documents.append(document)
+            self.server.paths.append(self.path)
+            self.server.clients.add(self.client_address)
+        if self.path.startswith("/slow"):
+            time.sleep(0.1)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """ Don't log requests """
+
+
+@pytest.fixture(name="stand_in")
+def fixture_stand_in():
+    """ Run a stand-in target server """
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_load(stand_in):
+    """ Test that documents are sent over pooled connections """
+    schema = {
+        "type": "object",
+        "properties": {"id": {"type": "integer"}},
+        "required": ["id"],
+    }
+    url = f"http://127.0.0.1:{stand_in.server_address[1]}/ingest"
+    report = run_load(schema, url, count=50, concurrency=3)
+
+    assert report["requests"] == 50
+    assert report["errors"] == 0
+    assert report["status_counts"] == {201: 50}
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+
+    assert len(stand_in.documents) == 50
+    assert all(isinstance(doc["id"], int) for doc in stand_in.documents)
+    # Connections are kept alive and reused
+    assert len(stand_in.clients) <= 3
+
+
+def test_load_rate(stand_in):
+    """ Test that the target rate limits throughput """
+    url = f"http://127.0.0.1:{stand_in.server_address[1]}/"
+    report = run_load({"type": "string"}, url, count=10, rate=50)
+
+    assert report["requests"] == 10
+    # 10 requests at 50 per second take at least 9 intervals
+    assert report["elapsed_seconds"] >= 9 / 50
+
+
+def test_load_query(stand_in):
+    """ Test that the query string of the target URL is sent """
+    url = f"http://127.0.0.1:{stand_in.server_address[1]}/ingest?x=1&y=2"
+    run_load({"type": "null"}, url, count=2, concurrency=1)
+    assert stand_in.paths == ["/ingest?x=1&y=2"] * 2
+
+
+def test_load_rate_latency(stand_in):
+    """ Test that latency includes time waiting behind slow requests """
+    url = f"http://127.0.0.1:{stand_in.server_address[1]}/slow"
+    report = run_load(
+        {"type": "null"}, url, count=5, concurrency=1, rate=50)
+    # Each request takes 0.1 s but one is scheduled every 0.02 s,
+    # so the last one is sent about 0.32 s late
+    assert report["latency_ms"]["max"] >= 300
+
+
+def test_load_unreachable():
+    """ Test that connection failures are counted as errors """
+    report = run_load(
+        {"type": "null"}, "http://127.0.0.1:9/", count=3, concurrency=1)
+    assert report["requests"] == 0
+    assert report["errors"] == 3
+
+
+def test_percentile():
+    """ Test nearest-rank percentiles """
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 100
+    assert percentile([], 0.5) is None
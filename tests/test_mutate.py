@@ -0,0 +1,152 @@
+"""Test mutation-based sample derivation."""
+import copy
+import random
+
+import jsonschema
+
+from json_schema_fuzz import compile_schema, generate_json
+from json_schema_fuzz.mutate import mutate_json
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer", "minimum": 0, "maximum": 1000},
+        "name": {"type": "string", "maxLength": 8},
+        "tags": {
+            "type": "array",
+            "maxItems": 4,
+            "items": {"type": "string", "pattern": "^[a-z]{3}$"},
+        },
+        "children": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "weight": {"type": "number", "minimum": 0},
+                    "flags": {
+                        "type": "array",
+                        "items": {"type": "boolean"},
+                        "minItems": 2,
+                        "maxItems": 2,
+                    },
+                },
+                "required": ["weight", "flags"],
+            },
+        },
+    },
+    "required": ["id", "tags", "children"],
+}
+
+
+def test_mutations_are_valid():
+    """ Test that repeated mutations keep documents valid """
+    random.seed(1)
+    validator = jsonschema.Draft7Validator(SCHEMA)
+    schema = compile_schema(SCHEMA)
+
+    document = generate_json(schema)
+    for _ in range(300):
+        document = mutate_json(schema, document)
+        validator.validate(document)
+
+
+def test_mutations_keep_max_properties():
+    """ Test that mutations don't add properties past maxProperties """
+    random.seed(2)
+    object_schema = {
+        "type": "object",
+        "properties": {
+            "a": {"type": "integer"},
+            "b": {"type": "null"},
+            "c": {"type": "boolean"},
+        },
+        "maxProperties": 1,
+    }
+    validator = jsonschema.Draft7Validator(object_schema)
+    schema = compile_schema(object_schema)
+
+    document = generate_json(schema)
+    for _ in range(200):
+        document = mutate_json(schema, document)
+        validator.validate(document)
+
+
+def test_mutation_doesnt_modify():
+    """ Test that the input document is not modified """
+    random.seed(2)
+    schema = compile_schema(SCHEMA)
+    document = generate_json(schema)
+    original = copy.deepcopy(document)
+
+    changed = 0
+    for _ in range(50):
+        if mutate_json(schema, document) != original:
+            changed += 1
+        assert document == original
+    assert changed > 0
+
+
+def test_mutation_shares_untouched_subtrees():
+    """ Test that only containers on the mutated path are copied """
+    random.seed(3)
+    schema = compile_schema(SCHEMA)
+    document = generate_json(schema)
+    mutated = mutate_json(schema, document)
+
+    assert mutated is not document
+    shared = [
+        key for key in ("tags", "children")
+        if mutated[key] is document[key]
+    ]
+    assert len(shared) >= 1
+
+
+def test_mutate_combination():
+    """ Test that combination subschemas are regenerated whole """
+    schema = compile_schema({
+        "anyOf": [{"type": "integer"}, {"type": "string"}],
+    })
+    for _ in range(20):
+        value = mutate_json(schema, 5)
+        assert isinstance(value, (int, str))
+
+
+def test_mutate_enum():
+    """ Test that enum values are replaced whole """
+    schema = compile_schema({"enum": [[1, 2], {"a": 1}]})
+    for _ in range(20):
+        assert mutate_json(schema, [1, 2]) in ([1, 2], {"a": 1})
+
+    schema = compile_schema({
+        "type": "array",
+        "items": {"type": "integer"},
+        "not": {"enum": [[1, 2]]},
+    })
+    for _ in range(20):
+        assert mutate_json(schema, [1, 3]) != [1, 2]
+
+
+def test_mutation_descends_into_large_containers():
+    """ Test that large arrays are changed one element at a time """
+    random.seed(0)
+    schema = compile_schema({
+        "type": "array",
+        "minItems": 100,
+        "maxItems": 100,
+        "items": {
+            "type": "array",
+            "minItems": 20,
+            "maxItems": 20,
+            "items": {"type": "integer"},
+        },
+    })
+    document = generate_json(schema)
+    for _ in range(20):
+        mutated = mutate_json(schema, document)
+        changed = [
+            (row, column)
+            for row in range(100)
+            for column in range(20)
+            if mutated[row][column] != document[row][column]
+        ]
+        assert len(changed) <= 1
@@ -0,0 +1,124 @@
+"""Test pre-generated string pools."""
+import random
+import re
+import time
+
+import pytest
+
+from json_schema_fuzz import generate_json, sample_at
+from json_schema_fuzz.pools import (STRING_POOLS, disable_string_pools,
+                                    enable_string_pools)
+
+PATTERN = "^[a-f]{3}-[0-9]{4}$"
+
+
+@pytest.fixture(autouse=True)
+def fixture_disable_pools():
+    """ Make sure pools are disabled after each test """
+    yield
+    disable_string_pools()
+
+
+def test_pattern_pool():
+    """ Test that pattern strings are drawn from a fixed pool """
+    enable_string_pools(size=10)
+    schema = {"type": "string", "pattern": PATTERN}
+
+    values = {generate_json(schema) for _ in range(200)}
+    assert len(values) <= 10
+    for value in values:
+        assert re.fullmatch(PATTERN, value)
+    assert len(STRING_POOLS.pools) == 1
+
+
+def test_length_pool():
+    """ Test that each length range gets its own pool """
+    enable_string_pools(size=5)
+    short = {generate_json({"type": "string", "maxLength": 2})
+             for _ in range(50)}
+    long = {generate_json({"type": "string", "minLength": 20})
+            for _ in range(50)}
+
+    assert all(len(value) <= 2 for value in short)
+    assert all(20 <= len(value) <= 70 for value in long)
+    assert len(long) <= 5
+    assert len(STRING_POOLS.pools) == 2
+
+
+def test_unbounded_strings_not_pooled():
+    """ Test that plain strings without constraints skip the pools """
+    enable_string_pools(size=5)
+    generate_json({"type": "string"})
+    assert len(STRING_POOLS.pools) == 0
+
+
+def test_refresh():
+    """ Test that refreshing replaces the pool contents """
+    random.seed(0)
+    enable_string_pools(size=50)
+    schema = {"type": "string", "pattern": PATTERN}
+    generate_json(schema)
+
+    pool = next(iter(STRING_POOLS.pools.values()))
+    before = list(pool.values)
+    pool.refresh()
+    assert len(pool.values) == 50
+    assert pool.values != before
+
+
+def test_parallel_fill():
+    """ Test filling pools with worker processes """
+    enable_string_pools(size=40, processes=2)
+    generate_json({"type": "string", "pattern": PATTERN})
+
+    pool = next(iter(STRING_POOLS.pools.values()))
+    assert len(pool.values) == 40
+    # Workers are seeded separately so their chunks differ
+    assert pool.values[:20] != pool.values[20:]
+
+
+def test_disable():
+    """ Test that disabling pools frees them """
+    enable_string_pools(size=5)
+    generate_json({"type": "string", "pattern": PATTERN})
+    disable_string_pools()
+    assert not STRING_POOLS.enabled
+    assert len(STRING_POOLS.pools) == 0
+
+
+def test_background_refresh():
+    """ Test that pools are refreshed in the background """
+    enable_string_pools(size=50, refresh_interval=0.01)
+    generate_json({"type": "string", "pattern": PATTERN})
+    pool = next(iter(STRING_POOLS.pools.values()))
+    before = pool.values
+
+    for _ in range(100):
+        if pool.values is not before:
+            break
+        time.sleep(0.01)
+    assert pool.values is not before
+
+
+def test_seeded_samples_independent_of_fill():
+    """ Test that filling a pool doesn't change seeded samples """
+    schema = {"type": "string", "pattern": PATTERN}
+    enable_string_pools(size=50)
+    first = [sample_at(schema, 7, index) for index in range(6)]
+
+    # Start with empty pools and fill them at a later index
+    enable_string_pools(size=50)
+    assert sample_at(schema, 7, 5) == first[5]
+
+
+def test_refresh_keeps_random_state():
+    """ Test that refreshing doesn't draw from the global random state """
+    enable_string_pools(size=20)
+    generate_json({"type": "string", "pattern": PATTERN})
+    pool = next(iter(STRING_POOLS.pools.values()))
+
+    random.seed(3)
+    expected = random.random()
+    random.seed(3)
+    pool.refresh()
+    assert random.random() == expected
@@ -5,7 +5,9 @@ from pathlib import Path
 
 import pytest
 
-from json_schema_fuzz.schema_operations import invert, merge
+from json_schema_fuzz.schema_operations import (MAX_NESTING, canonicalize,
+                                                canonicalize_with_report,
+                                                invert, merge)
 
 THIS_DIR = Path(__file__).parent
 MERGE_CASE_DIR = THIS_DIR / "merge_cases"
@@ -52,3 +54,140 @@ for filename in invert_case_files:
 def test_invert(schema, inverted):
     """Test that the given schema results in the `inverted` schema."""
     assert invert(schema) == inverted
+
+
+def test_merge_enum():
+    """ Test that enum and const are intersected when merging """
+    assert merge(
+        {"enum": [1, 2, "a", None]},
+        {"type": "integer"},
+        {"enum": [2, 3, None]},
+    ) == {"enum": [2], "type": ["integer"]}
+    assert merge({"const": "a"}, {"enum": ["a", "b"]}) == {"enum": ["a"]}
+    assert merge({"const": 1}, {"maximum": 0}) == \
+        {"enum": [], "maximum": 0}
+
+
+def test_merge_format():
+    """ Test that different formats rule out strings """
+    assert merge({"format": "uuid"}, {"format": "uuid"}) == \
+        {"format": "uuid"}
+    assert merge(
+        {"type": "string", "format": "uuid"}, {"format": "ipv4"},
+    ) is False
+    merged = merge({"format": "uuid"}, {"format": "ipv4"})
+    assert set(merged) == {"type"}
+    assert "string" not in merged["type"]
+
+    # A format that must not hold also rules out strings
+    merged = merge({"format": "uuid"}, {"notFormat": ["uuid", "date"]})
+    assert "string" not in merged["type"]
+    assert merge(
+        {"notFormat": ["uuid"]}, {"notFormat": ["date", "uuid"]},
+    ) == {"notFormat": ["uuid", "date"]}
+
+
+def test_merge_weighted():
+    """ Test that weighted anyOf branches are merged with their weights """
+    assert merge(
+        {"anyOf": [{"minimum": 1}, {"maximum": 5}], "anyOfWeights": [1, 2]},
+        {"anyOf": [{"multipleOf": 2}, {}], "anyOfWeights": [3, 4]},
+        {"type": "integer"},
+    ) == {
+        "anyOf": [
+            {"type": ["integer"], "minimum": 1, "multipleOf": 2},
+            {"type": ["integer"], "minimum": 1},
+            {"type": ["integer"], "maximum": 5, "multipleOf": 2},
+            {"type": ["integer"], "maximum": 5},
+        ],
+        "anyOfWeights": [3, 4, 6, 8],
+    }
+
+
+def test_merge_simplifies_anyof():
+    """ Test that merging doesn't keep duplicate or subsumed branches """
+    assert merge(
+        {"anyOf": [{"minimum": 1}, {"maximum": 5}]},
+        {"anyOf": [{"minimum": 1}, {"minimum": 1, "multipleOf": 2}]},
+    ) == {"minimum": 1}
+    assert merge(
+        {"anyOf": [False, {"anyOf": [{"minimum": 1}, {"minimum": 1}]}]},
+    ) == {"minimum": 1}
+    assert merge({"anyOf": [False, False]}) is False
+
+
+def test_canonicalize():
+    """ Test that canonicalizing keeps one copy of each needed branch """
+    schema = {
+        "type": "object",
+        "properties": {
+            "a": {
+                "anyOf": [
+                    {"type": "integer"},
+                    {"anyOf": [
+                        False,
+                        {"type": "integer", "minimum": 0},
+                        {"type": "null"},
+                    ]},
+                    {"type": "null"},
+                ],
+            },
+            "b": {"allOf": [True, {"allOf": [{"maxLength": 3}]}]},
+            "c": {"anyOf": [{"type": "null"}, {}]},
+            "d": {"anyOf": [False]},
+        },
+    }
+    assert canonicalize(schema) == {
+        "type": "object",
+        "properties": {
+            "a": {"anyOf": [{"type": "integer"}, {"type": "null"}]},
+            "b": {"maxLength": 3},
+            "c": {},
+            "d": False,
+        },
+    }
+    # Weighted branches and oneOf options are kept as given
+    weighted = {"anyOf": [{}, {}], "anyOfWeights": [1, 2]}
+    assert canonicalize(weighted) == weighted
+    one_of = {"oneOf": [{"type": "null"}, {"type": "null"}]}
+    assert canonicalize(one_of) == one_of
+
+
+def test_canonicalize_context_dependent():
+    """ Test that additionalProperties blocks subsumption """
+    schema = {"anyOf": [
+        {"additionalProperties": False},
+        {"additionalProperties": False, "properties": {"a": {}}},
+        {"additionalProperties": False},
+    ]}
+    assert canonicalize(schema) == {"anyOf": schema["anyOf"][:2]}
+
+
+def test_canonicalize_with_report():
+    """ Test the size report of canonicalizing """
+    schema = {"anyOf": [{"type": "null"}, {"type": "null"}]}
+    canonical, report = canonicalize_with_report(schema)
+    assert canonical == {"type": "null"}
+    assert report == {
+        "before": {"nodes": 6, "bytes": 47},
+        "after": {"nodes": 2, "bytes": 16},
+    }
+
+
+def test_merge_deep_nesting():
+    """ Test that merging leaves subschemas past MAX_NESTING in an allOf """
+    schema = {"type": "null"}
+    for _ in range(MAX_NESTING + 10):
+        schema = {"properties": {"child": schema}}
+    merged = merge(schema, schema)
+    for _ in range(MAX_NESTING + 1):
+        merged = merged["properties"]["child"]
+    assert set(merged) == {"allOf"}
+
+
+def test_not():
+    """ Test that not is merged into the inverse of its subschema """
+    assert merge({"not": {"type": "null"}}, {"not": {"minimum": 1}}) == {
+        "not": {"anyOf": [{"type": "null"}, {"minimum": 1}]},
+    }
+    assert invert({"not": {"minimum": 1}}) == {"minimum": 1}
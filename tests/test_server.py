@@ -0,0 +1,148 @@
+"""Test generator server."""
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import json_schema_fuzz.server
+from json_schema_fuzz import RejectionSamplingFailed
+from json_schema_fuzz.server import GeneratorServer
+
+THIS_DIR = Path(__file__).parent
+SCHEMA_ROOT = THIS_DIR / "generate_cases"
+STRING_SCHEMA_FILE = SCHEMA_ROOT / "simple_types" / "stringLength.json"
+
+
+def run_server(server):
+    """ Run a server in a background thread and yield its URL """
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(name="server_url")
+def fixture_server_url():
+    """ Run a generator server in a background thread """
+    yield from run_server(
+        GeneratorServer(("127.0.0.1", 0), schema_root=SCHEMA_ROOT))
+
+
+def register_schema(server_url, schema):
+    """ POST a schema to the server and return its hash """
+    request = urllib.request.Request(
+        f"{server_url}/schemas",
+        data=json.dumps(schema).encode("utf-8"),
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["schema"]
+
+
+def get_samples(server_url, query):
+    """ GET samples from the server and parse NDJSON """
+    with urllib.request.urlopen(f"{server_url}/samples?{query}") as response:
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        return [json.loads(line) for line in response]
+
+
+def test_samples_by_hash(server_url):
+    """ Test registering a schema and streaming samples by hash """
+    schema = {"type": "integer", "minimum": 3, "maximum": 9}
+    key = register_schema(server_url, schema)
+
+    samples = get_samples(server_url, f"schema={key}&count=25")
+    assert len(samples) == 25
+    for sample in samples:
+        assert isinstance(sample, int)
+        assert 3 <= sample <= 9
+
+    # Registering the same schema again gives the same hash
+    assert register_schema(server_url, dict(reversed(schema.items()))) == key
+
+
+def test_samples_by_path(server_url):
+    """ Test streaming samples from a schema file """
+    samples = get_samples(
+        server_url, f"schema={STRING_SCHEMA_FILE}&count=5")
+    assert len(samples) == 5
+    assert all(isinstance(sample, str) for sample in samples)
+
+
+def test_path_outside_root(server_url, tmp_path):
+    """ Test that files outside the schema root can't be read """
+    schema_file = tmp_path / "secret.json"
+    schema_file.write_text(json.dumps({"const": "secret"}))
+    for path in (schema_file, SCHEMA_ROOT / ".." / "test_server.py"):
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            get_samples(server_url, f"schema={path}")
+        assert exc_info.value.code == 404
+
+
+def test_schema_files_only(tmp_path):
+    """ Test that without a root only the given files can be read """
+    allowed = tmp_path / "allowed.json"
+    allowed.write_text(json.dumps({"const": "allowed"}))
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps({"const": "other"}))
+
+    server = GeneratorServer(("127.0.0.1", 0), schema_files=[str(allowed)])
+    for server_url in run_server(server):
+        assert get_samples(server_url, f"schema={allowed}") == ["allowed"]
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            get_samples(server_url, f"schema={other}")
+        assert exc_info.value.code == 404
+
+
+def test_seed_is_reproducible(server_url):
+    """ Test that the same seed gives the same samples """
+    key = register_schema(server_url, {"type": "number"})
+    first = get_samples(server_url, f"schema={key}&count=10&seed=7")
+    second = get_samples(server_url, f"schema={key}&count=10&seed=7")
+    assert first == second
+
+    # Any index can be requested on its own
+    assert get_samples(
+        server_url, f"schema={key}&count=3&seed=7&start=4") == first[4:7]
+
+
+def test_unknown_schema(server_url):
+    """ Test that an unknown schema returns 404 """
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        get_samples(server_url, "schema=doesnotexist")
+    assert exc_info.value.code == 404
+
+
+def test_first_sample_fails(server_url):
+    """ Test that failing to generate any sample returns an error status """
+    key = register_schema(server_url, {
+        "type": "object",
+        "additionalProperties": False,
+        "minProperties": 1,
+    })
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        get_samples(server_url, f"schema={key}&count=3")
+    assert exc_info.value.code == 422
+
+
+def test_later_sample_fails(server_url, monkeypatch):
+    """ Test that a failure after the first sample ends with an error line """
+    calls = []
+
+    def failing_generate_json(schema):
+        calls.append(schema)
+        if len(calls) > 2:
+            raise RejectionSamplingFailed("no luck")
+        return None
+
+    monkeypatch.setattr(
+        json_schema_fuzz.server, "generate_json", failing_generate_json)
+    key = register_schema(server_url, {"type": "null"})
+    samples = get_samples(server_url, f"schema={key}&count=5")
+    assert samples == [
+        None, None, {"error": "Failed to generate sample: no luck"},
+    ]
@@ -0,0 +1,82 @@
+"""Test sharded corpus output."""
+import gzip
+import hashlib
+import json
+import os
+
+import pytest
+
+from json_schema_fuzz import compile_schema, sample_at
+from json_schema_fuzz.shards import write_schema_shards
+
+SCHEMA = {
+    "type": "object",
+    "required": ["id", "name"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 0},
+        "name": {"type": "string", "maxLength": 6},
+    },
+}
+
+
+def read_shard(path):
+    """ Read documents from a compressed NDJSON shard """
+    with gzip.open(path, "rt") as stream:
+        return [json.loads(line) for line in stream]
+
+
+def test_write_shards(tmp_path):
+    """ Test that shards and the manifest describe the same corpus """
+    prefix = str(tmp_path / "corpus")
+    manifest = write_schema_shards(
+        SCHEMA, prefix, 25, shards=3, processes=2, seed=11)
+
+    with open(f"{prefix}-manifest.json") as stream:
+        assert json.load(stream) == manifest
+
+    assert manifest["seed"] == 11
+    assert manifest["documents"] == 25
+    assert [entry["path"] for entry in manifest["shards"]] == [
+        "corpus-00000.ndjson.gz",
+        "corpus-00001.ndjson.gz",
+        "corpus-00002.ndjson.gz",
+    ]
+    assert sum(entry["documents"] for entry in manifest["shards"]) == 25
+
+    compiled = compile_schema(SCHEMA)
+    next_index = 0
+    for entry in manifest["shards"]:
+        path = tmp_path / entry["path"]
+        assert entry["bytes"] == os.path.getsize(path)
+        assert entry["sha256"] == \
+            hashlib.sha256(path.read_bytes()).hexdigest()
+
+        # Shards cover consecutive index ranges of the sequence
+        assert entry["start_index"] == next_index
+        next_index = entry["stop_index"]
+        documents = read_shard(path)
+        assert len(documents) == entry["documents"]
+        assert documents == [
+            sample_at(compiled, 11, index)
+            for index in range(entry["start_index"], entry["stop_index"])
+        ]
+    assert next_index == 25
+
+
+def test_shards_are_reproducible(tmp_path):
+    """ Test that the same seed gives byte-identical shards """
+    first = write_schema_shards(
+        SCHEMA, str(tmp_path / "first"), 10, shards=2, seed=5)
+    second = write_schema_shards(
+        SCHEMA, str(tmp_path / "second"), 10, shards=2, seed=5)
+    assert [entry["sha256"] for entry in first["shards"]] == \
+        [entry["sha256"] for entry in second["shards"]]
+
+
+def test_shard_count_must_be_positive(tmp_path):
+    """ Test that zero shards or processes are rejected """
+    with pytest.raises(ValueError):
+        write_schema_shards(SCHEMA, str(tmp_path / "corpus"), 10, shards=0)
+    with pytest.raises(ValueError):
+        write_schema_shards(
+            SCHEMA, str(tmp_path / "corpus"), 10, shards=2, processes=0)
@@ -0,0 +1,87 @@
+"""Test weighted multi-schema workloads."""
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from json_schema_fuzz.cache import SchemaCache
+from json_schema_fuzz.workload import Workload, load_workload
+
+
+def write_schema(path, schema):
+    """ Write schema as JSON to path """
+    path.write_text(json.dumps(schema))
+    return path
+
+
+def test_weights():
+    """ Test that samples are interleaved according to the weights """
+    random.seed(0)
+    workload = Workload()
+    workload.add({"type": "string"}, weight=3, name="string")
+    workload.add({"type": "boolean"}, weight=1, name="boolean")
+
+    counts = Counter(
+        workload.sample_with_name()[0] for _ in range(4000)
+    )
+    assert set(counts) == {"string", "boolean"}
+    assert 2.5 < counts["string"] / counts["boolean"] < 3.5
+
+
+def test_shared_cache():
+    """ Test that each distinct schema is compiled once """
+    cache = SchemaCache()
+    workload = Workload(cache)
+    workload.add({"type": "null"}, name="a")
+    workload.add({"type": "null"}, name="b")
+    workload.add({"type": "integer"})
+
+    assert len(workload) == 3
+    assert len(cache) == 2
+    assert workload.schemas[0] is workload.schemas[1]
+
+
+def test_invalid_weight():
+    """ Test that weights must be positive """
+    with pytest.raises(ValueError):
+        Workload().add({}, weight=0)
+
+
+def test_load_manifest(tmp_path):
+    """ Test loading a workload from a manifest file """
+    write_schema(tmp_path / "number.json", {"type": "number"})
+    write_schema(tmp_path / "null.json", {"type": "null"})
+    manifest = write_schema(tmp_path / "manifest.json", {
+        "schemas": [
+            {"path": "number.json", "weight": 2.5},
+            {"path": "null.json", "name": "nothing"},
+        ]
+    })
+
+    workload = load_workload(str(manifest))
+    assert workload.names == ["number.json", "nothing"]
+    assert workload.cumulative_weights == [2.5, 3.5]
+    for _ in range(20):
+        name, sample = workload.sample_with_name()
+        if name == "nothing":
+            assert sample is None
+        else:
+            assert sample is not None
+
+
+def test_load_directory(tmp_path):
+    """ Test loading every schema in a directory """
+    write_schema(tmp_path / "a.json", {"type": "string"})
+    write_schema(tmp_path / "b.json", {"type": "integer"})
+    (tmp_path / "notes.txt").write_text("not a schema")
+
+    workload = load_workload(str(tmp_path))
+    assert workload.names == ["a.json", "b.json"]
+    assert workload.cumulative_weights == [1.0, 2.0]
+
+
+def test_load_empty_directory(tmp_path):
+    """ Test that an empty workload is rejected """
+    with pytest.raises(ValueError):
+        load_workload(str(tmp_path))